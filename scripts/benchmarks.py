@@ -0,0 +1,489 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the documentation parsing scripts.
+Runs the parsers on synthetic inputs scaled up from docs/api_docs.html.
+
+With --suite every pipeline stage is timed at each scale and the results are
+written as JSON, optionally compared against an earlier run's JSON.
+"""
+
+import argparse
+import contextlib
+import gc
+import html
+import io
+import json
+import platform
+import re
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+from comprehensive_parser import extract_endpoints_from_html
+from collection_stream import iter_item_events
+from content_cache import DEFAULT_CACHE_DIR
+from doc_scanner import ENGINES, clear_scan_cache, read_document, scan_document
+from parse_api_docs import PostmanHTMLParser
+from postman_to_openapi import PostmanToOpenAPI
+import spec_yaml
+from section_parser import extract_endpoint_from_section, parse_api_docs_by_sections
+from split_openapi import split_openapi
+
+DOCS_HTML = Path(__file__).parent.parent / 'docs' / 'api_docs.html'
+CONVERTED_SPEC = Path(__file__).parent.parent / 'specs' / 'megaport-api-converted.yaml'
+SUITE_OUTPUT = DEFAULT_CACHE_DIR / 'benchmarks' / 'results.json'
+HTTP_METHODS = ('get', 'put', 'post', 'delete', 'options', 'head', 'patch', 'trace')
+# Saved response example attached to every synthetic request, as exported
+# collections embed them
+EXAMPLE_RESPONSE_BODY = json.dumps({'data': [{'productUid': f"{i:08x}-0000-4000-8000-000000000000",
+                                              'provisioningStatus': 'LIVE'} for i in range(64)]}, indent=2)
+
+# The DOTALL pattern comprehensive_parser used before the anchored scanner
+LEGACY_SECTION_PATTERN = re.compile(r'<section id="([^"]+)"[^>]*>.*?<h3[^>]*>.*?<span class="sc-fzoaKM ([^"]+)">(\w+)</span><span[^>]*>([^<]+)</span>', re.DOTALL)
+
+# The per-section patterns section_parser searched one after another, as
+# strings compiled (through the re cache) on every call
+LEGACY_METHOD_NAME_PATTERN = r'<span class="sc-fzoaKM [^"]+">(\w+)</span><span class="sc-fzomuh eaYntv documentation-core-item-request-name">([^<]+)</span>'
+LEGACY_URL_PATTERNS = [
+    r'https://api-staging\.megaport\.com(/v\d+/[^\s"\'<>&]+)',
+    r'"url"\s*:\s*"https://api-staging\.megaport\.com(/v\d+/[^\s"\']+)"',
+    r'href="https://api-staging\.megaport\.com(/v\d+/[^\s"\'<>&]+)"'
+]
+LEGACY_DESC_PATTERN = r'<div class="sc-fzoJIu [^"]+">([^<]+)</div>'
+
+# Sections with no request header, as found after the last request in an export
+HEADERLESS_SECTION = '<section id="example-{0}" style="margin-bottom: 50px;"><p><span>Example response {0}</span></p></section>'
+HEADERLESS_SECTIONS_PER_SCALE = 200
+
+
+def scaled_document(content, scale):
+    """Repeat the document scale times and end it with a header-less tail that grows with scale."""
+    tail = ''.join(HEADERLESS_SECTION.format(i) for i in range(scale * HEADERLESS_SECTIONS_PER_SCALE))
+    return content * scale + tail
+
+
+def time_call(func, *args):
+    """Return (result, seconds) for one call of func."""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def scanner_section_headers(content):
+    return [match[1:] for match in scan_document(content).section_headers()]
+
+
+def legacy_section_headers(content):
+    return LEGACY_SECTION_PATTERN.findall(content)
+
+
+def bench_section_headers(content, scales, legacy_max_scale):
+    """Time the section/header scanner, and the legacy regex up to legacy_max_scale."""
+    print(f"{'scale':>6} {'size MB':>9} {'scanner s':>10} {'s per MB':>9} {'legacy s':>10} {'s per MB':>9}")
+    for scale in scales:
+        document = scaled_document(content, scale)
+        size_mb = len(document) / 1_000_000
+        scanned, scanner_seconds = time_call(scanner_section_headers, document)
+        line = f"{scale:>6} {size_mb:>9.1f} {scanner_seconds:>10.3f} {scanner_seconds / size_mb:>9.4f}"
+        if scale <= legacy_max_scale:
+            legacy, legacy_seconds = time_call(legacy_section_headers, document)
+            if legacy != scanned:
+                raise SystemExit(f"Scanner and legacy regex disagree at scale {scale}")
+            line += f" {legacy_seconds:>10.3f} {legacy_seconds / size_mb:>9.4f}"
+        print(line)
+
+
+def legacy_extract_fields(section_html):
+    """Per-section method/name, URL and description lookup as section_parser did it before."""
+    method_name_match = re.search(LEGACY_METHOD_NAME_PATTERN, section_html)
+    url_match = None
+    for pattern in LEGACY_URL_PATTERNS:
+        url_match = re.search(pattern, section_html)
+        if url_match:
+            break
+    desc_match = re.search(LEGACY_DESC_PATTERN, section_html)
+    return method_name_match, url_match, desc_match
+
+
+def bench_section_extraction(content, repeat):
+    """Average per-section cost of the legacy pattern loop and of section_parser's precompiled patterns."""
+    scan = scan_document(content)
+    sections = scan.sections
+    owners = {sections.innermost(offset): offset for offset, _, _ in reversed(scan.request_headers)}
+    work = [(sections.ids[i], start, sections.ends[i]) for i, start in sorted(owners.items())]
+    bodies = [content[start:end] for _, start, end in work]
+
+    _, legacy_seconds = time_call(lambda: [legacy_extract_fields(body) for _ in range(repeat) for body in bodies])
+    _, new_seconds = time_call(lambda: [extract_endpoint_from_section(content, section_id, start, end)
+                                        for _ in range(repeat) for section_id, start, end in work])
+    calls = repeat * len(work)
+    print(f"{len(work)} sections x {repeat} runs")
+    print(f"  legacy pattern loop: {legacy_seconds / calls * 1e6:8.1f} us/section")
+    print(f"  precompiled:         {new_seconds / calls * 1e6:8.1f} us/section")
+
+
+def load_with_engine(path, engine):
+    """Read and scan path the way doc_scanner.load_scan does for engine, without its cache."""
+    return scan_document(read_document(path, engine))
+
+
+def bench_engines(content, scales):
+    """Time reading plus scanning a scaled file with each scan engine."""
+    print(f"{'scale':>6} {'size MB':>9}" + ''.join(f" {engine + ' s':>10}" for engine in ENGINES))
+    for scale in scales:
+        document = scaled_document(content, scale)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'api_docs.html'
+            path.write_text(document, encoding='utf-8')
+            line = f"{scale:>6} {len(document) / 1_000_000:>9.1f}"
+            for engine in ENGINES:
+                _, seconds = time_call(load_with_engine, path, engine)
+                line += f" {seconds:>10.3f}"
+        print(line)
+
+
+def legacy_process_items(converter, items, tag=""):
+    """PostmanToOpenAPI.process_items before the single-pass walk: recursive, merging each folder's paths upwards."""
+    paths = {}
+    for item in items:
+        if 'item' in item and isinstance(item['item'], list):
+            sub_paths = legacy_process_items(converter, item['item'], item.get('name', 'default'))
+            for path, methods in sub_paths.items():
+                if path not in paths:
+                    paths[path] = {}
+                paths[path].update(methods)
+        elif 'request' in item:
+            result = converter.convert_request_to_operation(item, tag or "default")
+            if result:
+                path, method, operation = result
+                if path not in paths:
+                    paths[path] = {}
+                paths[path][method] = operation
+    return paths
+
+
+def legacy_extract_tags(items):
+    """PostmanToOpenAPI.extract_tags before the single-pass walk."""
+    tags = {}
+    for item in items:
+        if 'item' in item and isinstance(item['item'], list):
+            folder_name = item.get('name', '')
+            tags[folder_name] = {"name": folder_name,
+                                 "description": re.sub(r'<[^>]+>', '', item.get('description', ''))}
+            for tag in legacy_extract_tags(item['item']):
+                if tag['name'] not in tags:
+                    tags[tag['name']] = tag
+    return list(tags.values())
+
+
+def nested_items(depth, requests_per_folder):
+    """A chain of depth folders, each holding requests_per_folder requests and the next folder."""
+    items = []
+    for level in reversed(range(depth)):
+        requests = [{'name': f"Request {level}.{i}",
+                     'request': {'method': 'GET', 'url': {'path': ['v2', f"level{level}", f"r{i}", ':id'],
+                                                         'variable': [{'key': 'id'}]},
+                                 'auth': {'type': 'bearer'}}}
+                    for i in range(requests_per_folder)]
+        items = [{'name': f"Folder {level}", 'description': f"<p>Level {level}</p>", 'item': requests + items}]
+    return items
+
+
+def time_without_gc(func):
+    """time_call with the cyclic collector paused, whose passes over a growing heap would blur the scaling."""
+    gc.collect()
+    gc.disable()
+    try:
+        return time_call(func)
+    finally:
+        gc.enable()
+
+
+def bench_nesting(depths, requests_per_folder):
+    """Time the single-pass item walk and the legacy recursive walks on deeply nested collections."""
+    converter = PostmanToOpenAPI('', '')
+    print(f"{'depth':>6} {'operations':>11} {'walk s':>9} {'us per op':>10} {'legacy s':>9} {'us per op':>10}")
+    for depth in depths:
+        items = nested_items(depth, requests_per_folder)
+        operations = depth * requests_per_folder
+        (_, paths, tags), seconds = time_without_gc(lambda: converter.walk_items(iter_item_events(items)))
+        line = f"{depth:>6} {operations:>11} {seconds:>9.3f} {seconds / operations * 1e6:>10.1f}"
+        try:
+            legacy, legacy_seconds = time_without_gc(lambda: (legacy_process_items(converter, items), legacy_extract_tags(items)))
+        except RecursionError:
+            line += f" {'recursion limit':>20}"
+        else:
+            if legacy != (paths, tags):
+                raise SystemExit(f"Single-pass walk and legacy walks disagree at depth {depth}")
+            line += f" {legacy_seconds:>9.3f} {legacy_seconds / operations * 1e6:>10.1f}"
+        print(line)
+
+
+def collection_from_spec(spec, scale):
+    """Build a Postman v2 collection with scale copies of every operation in an OpenAPI spec.
+
+    Operations are grouped into one folder per tag, as in the exported
+    collection. Copy k > 0 prefixes its paths with /s<k> and its folder names
+    with the copy number so paths stay unique.
+    """
+    tag_descriptions = {tag['name']: tag.get('description', '') for tag in spec.get('tags', [])}
+    folders = {}
+    for copy in range(scale):
+        prefix = f"/s{copy}" if copy else ''
+        suffix = f" {copy}" if copy else ''
+        for path, methods in spec.get('paths', {}).items():
+            segments = (prefix + path).strip('/').split('/')
+            variables = [{'key': segment[1:-1]} for segment in segments if segment.startswith('{')]
+            segments = [f":{segment[1:-1]}" if segment.startswith('{') else segment for segment in segments]
+            for method, operation in methods.items():
+                if method not in HTTP_METHODS:
+                    continue
+                request = {
+                    'method': method.upper(),
+                    'url': {
+                        'raw': 'https://api-staging.megaport.com/' + '/'.join(segments),
+                        'host': ['https://api-staging.megaport.com'],
+                        'path': segments,
+                        'variable': variables,
+                        'query': [{'key': param['name'], 'value': '', 'description': param.get('description', '')}
+                                  for param in operation.get('parameters', []) if param.get('in') == 'query'],
+                    },
+                    'auth': {'type': 'basic' if {'basicAuth': []} in operation.get('security', []) else 'bearer'},
+                }
+                if 'requestBody' in operation:
+                    request['body'] = {'mode': 'raw', 'raw': '{"example": true}'}
+                tag = (operation.get('tags') or ['default'])[0]
+                folder = folders.setdefault(tag + suffix, {
+                    'name': tag + suffix,
+                    'description': tag_descriptions.get(tag, ''),
+                    'item': [],
+                })
+                folder['item'].append({
+                    'name': operation.get('summary', ''),
+                    'description': operation.get('description', ''),
+                    'request': request,
+                    'response': [{'name': 'Example', 'status': 'OK', 'code': 200, 'body': EXAMPLE_RESPONSE_BODY}],
+                })
+    return {
+        'info': {'name': spec.get('info', {}).get('title', 'Megaport API'),
+                 'description': spec.get('info', {}).get('description', '')},
+        'item': list(folders.values()),
+    }
+
+
+def documenter_page(spec, scale):
+    """Render scale copies of every operation in an OpenAPI spec as Postman documenter request blocks.
+
+    docs/api_docs.html has request names but no request-url elements, so
+    PostmanHTMLParser finds no endpoints in it; this page gives it one per
+    operation. Copies are prefixed as in collection_from_spec.
+    """
+    blocks = []
+    for copy in range(scale):
+        prefix = f"/s{copy}" if copy else ''
+        for path, methods in spec.get('paths', {}).items():
+            for method, operation in methods.items():
+                if method not in HTTP_METHODS:
+                    continue
+                blocks.append(
+                    '<div class="documentation-core-item">'
+                    f'<h3><span class="documentation-core-item-request-name">{html.escape(operation.get("summary", ""))}</span></h3>'
+                    f'<div class="documentation-core-item-request-url">{method.upper()} '
+                    f'https://api-staging.megaport.com{html.escape(prefix + path)}</div>'
+                    f'<p>{html.escape(operation.get("description", ""))}</p>'
+                    f'<pre>{html.escape(EXAMPLE_RESPONSE_BODY)}</pre></div>\n')
+    return '<html><body>\n' + ''.join(blocks) + '</body></html>\n'
+
+
+def measure(func, runs=1):
+    """Return (result, seconds, peak traced MB) for func, with its stdout discarded.
+
+    Wall time is the best of runs untraced calls, since tracemalloc slows
+    allocation heavy code several times over; the peak comes from one more,
+    traced call.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        timings = [time_call(func) for _ in range(runs)]
+        result = timings[0][0]
+        seconds = min(seconds for _, seconds in timings)
+        tracemalloc.start()
+        try:
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return result, seconds, peak / 1_000_000
+
+
+def html_cases(workdir, content, spec, scale):
+    """Yield (case, input path, run) for the documentation parsers on a scaled copy of the docs.
+
+    PostmanHTMLParser runs on a documenter page built from spec instead,
+    since the docs hold no request-url elements for it to find.
+    """
+    path = workdir / f"api_docs-{scale}x.html"
+    path.write_text(content * scale, encoding='utf-8')
+    documenter_path = workdir / f"documenter-{scale}x.html"
+    documenter_path.write_text(documenter_page(spec, scale), encoding='utf-8')
+
+    def postman_html_parser():
+        with open(documenter_path, 'r', encoding='utf-8') as stream:
+            return list(PostmanHTMLParser().iter_endpoints(stream))
+
+    def sections():
+        clear_scan_cache()
+        return parse_api_docs_by_sections(path)['endpoints']
+
+    def comprehensive():
+        clear_scan_cache()
+        return extract_endpoints_from_html(path)['all_endpoints']
+
+    yield 'PostmanHTMLParser', documenter_path, postman_html_parser
+    yield 'parse_api_docs_by_sections', path, sections
+    yield 'extract_endpoints_from_html', path, comprehensive
+
+
+def spec_cases(workdir, spec, scale):
+    """Yield (case, input path, run) for collection conversion and spec splitting at a scale."""
+    collection_path = workdir / f"collection-{scale}x.json"
+    collection_path.write_text(json.dumps(collection_from_spec(spec, scale)), encoding='utf-8')
+    converted_path = workdir / f"converted-{scale}x.yaml"
+
+    def convert():
+        converted = PostmanToOpenAPI(str(collection_path), str(workdir)).convert()
+        return [operation for methods in converted['paths'].values() for operation in methods.values()]
+
+    def convert_stream():
+        converted = PostmanToOpenAPI(str(collection_path), str(workdir)).convert_stream()
+        return [operation for methods in converted['paths'].values() for operation in methods.values()]
+
+    def split():
+        output_base = workdir / f"split-{scale}x"
+        # Start empty every run; unchanged files would otherwise not be rewritten
+        shutil.rmtree(output_base, ignore_errors=True)
+        split_openapi(str(converted_path), str(output_base))
+        return list((output_base / 'paths').rglob('*.yaml'))
+
+    yield 'PostmanToOpenAPI.convert', collection_path, convert
+    yield 'PostmanToOpenAPI.convert_stream', collection_path, convert_stream
+    with contextlib.redirect_stdout(io.StringIO()):
+        converted = PostmanToOpenAPI(str(collection_path), str(workdir)).convert()
+    with open(converted_path, 'w', encoding='utf-8') as f:
+        spec_yaml.dump(converted, f, default_flow_style=False, sort_keys=False, allow_unicode=True)
+    yield 'split_openapi', converted_path, split
+
+
+def run_suite(content, spec, scales, runs):
+    """Run every suite case at every scale and return the result records."""
+    results = []
+    print(f"{'case':<32} {'scale':>6} {'input MB':>9} {'items':>7} {'seconds':>9} {'peak MB':>9} {'MB/s':>8} {'items/s':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        for scale in scales:
+            cases = list(html_cases(workdir, content, spec, scale))
+            for case, path, run in cases + list(spec_cases(workdir, spec, scale)):
+                items, seconds, peak_mb = measure(run, runs)
+                input_mb = path.stat().st_size / 1_000_000
+                record = {
+                    'case': case,
+                    'scale': scale,
+                    'input_mb': round(input_mb, 3),
+                    'items': len(items),
+                    'seconds': round(seconds, 4),
+                    'peak_mb': round(peak_mb, 3),
+                    'mb_per_s': round(input_mb / seconds, 2),
+                    'items_per_s': round(len(items) / seconds, 1),
+                }
+                results.append(record)
+                print(f"{case:<32} {scale:>6} {record['input_mb']:>9.1f} {record['items']:>7} {record['seconds']:>9.3f} "
+                      f"{record['peak_mb']:>9.1f} {record['mb_per_s']:>8.1f} {record['items_per_s']:>9.0f}")
+    return results
+
+
+def compare_results(results, baseline, tolerance):
+    """Print each case's change against baseline and return the slowdowns beyond tolerance."""
+    previous = {(record['case'], record['scale']): record for record in baseline['results']}
+    regressions = []
+    print(f"\n{'case':<32} {'scale':>6} {'seconds':>9} {'baseline':>9} {'change':>8} {'peak MB':>9} {'baseline':>9}")
+    for record in results:
+        before = previous.get((record['case'], record['scale']))
+        if before is None:
+            continue
+        change = record['seconds'] / before['seconds'] - 1 if before['seconds'] else 0.0
+        print(f"{record['case']:<32} {record['scale']:>6} {record['seconds']:>9.3f} {before['seconds']:>9.3f} "
+              f"{change:>+8.0%} {record['peak_mb']:>9.1f} {before['peak_mb']:>9.1f}")
+        if change > tolerance:
+            regressions.append(f"{record['case']} at {record['scale']}x: {change:+.0%} wall time")
+        if before['peak_mb'] and record['peak_mb'] / before['peak_mb'] - 1 > tolerance:
+            regressions.append(f"{record['case']} at {record['scale']}x: "
+                               f"{record['peak_mb'] / before['peak_mb'] - 1:+.0%} peak memory")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--html', type=Path, default=DOCS_HTML, help='documentation HTML to scale up')
+    parser.add_argument('--scales', default='1,10',
+                        help='comma-separated input scale factors; 100 needs a few hundred MB of memory')
+    parser.add_argument('--legacy-max-scale', type=int, default=10,
+                        help='largest scale to also run the quadratic legacy regex on')
+    parser.add_argument('--repeat', type=int, default=200, help='runs of the per-section micro-benchmark')
+    parser.add_argument('--depths', default='100,200,400,800,1600',
+                        help='comma-separated folder depths for the nested collection benchmark')
+    parser.add_argument('--requests-per-folder', type=int, default=5, help='requests in each nested folder')
+    parser.add_argument('--suite', action='store_true',
+                        help='time every pipeline stage instead of the scanner micro-benchmarks')
+    parser.add_argument('--spec', type=Path, default=CONVERTED_SPEC,
+                        help='converted OpenAPI spec the synthetic Postman collection is built from')
+    parser.add_argument('--runs', type=int, default=3, help='timed runs per suite case; the fastest is reported')
+    parser.add_argument('--output', type=Path, default=SUITE_OUTPUT, help='JSON file for the suite results')
+    parser.add_argument('--baseline', type=Path, help='earlier suite results to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='relative slowdown or memory growth over the baseline that fails the run')
+    args = parser.parse_args()
+
+    content = args.html.read_text(encoding='utf-8')
+    scales = [int(scale) for scale in args.scales.split(',')]
+
+    if args.suite:
+        spec = spec_yaml.load_spec(args.spec)
+        results = run_suite(content, spec, scales, args.runs)
+        report = {
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'runs': args.runs,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'results': results,
+        }
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2), encoding='utf-8')
+        print(f"\nResults saved to {args.output}")
+        if args.baseline:
+            baseline = json.loads(args.baseline.read_text(encoding='utf-8'))
+            regressions = compare_results(results, baseline, args.tolerance)
+            if regressions:
+                print("\nRegressions beyond tolerance:")
+                for regression in regressions:
+                    print(f"  {regression}")
+                sys.exit(1)
+        return
+
+    print("Section/header scan (comprehensive_parser)")
+    bench_section_headers(content, scales, args.legacy_max_scale)
+
+    print("\nRead + scan per engine (doc_scanner.load_scan)")
+    bench_engines(content, scales)
+
+    print("\nPer-section extraction (section_parser.extract_endpoint_from_section)")
+    bench_section_extraction(content, args.repeat)
+
+    print("\nNested collection walk (postman_to_openapi.PostmanToOpenAPI.walk_items)")
+    bench_nesting([int(depth) for depth in args.depths.split(',')], args.requests_per_folder)
+
+
+if __name__ == '__main__':
+    main()
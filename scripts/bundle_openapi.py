@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Bundle specs/openapi.yaml and the files it points at into one document.
+Every file is parsed once and every $ref target resolved once. External
+references are inlined where they are first used and later references to
+the same target point there, so recursive schemas survive bundling.
+--dereference replaces every $ref with its target instead.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from urllib.parse import quote, unquote
+
+import spec_yaml
+from content_cache import write_if_changed
+
+BASE_PATH = Path(__file__).parent.parent
+ROOT_FILE = BASE_PATH / 'specs' / 'openapi.yaml'
+SCHEMAS_DIR = BASE_PATH / 'specs' / 'components' / 'schemas'
+OUTPUT_FILE = BASE_PATH / 'specs' / 'openapi.bundled.yaml'
+
+# Characters a URI fragment may hold unescaped, besides the pointer's own '/'
+POINTER_SAFE = "/~-._!$&'()*+,;=:@"
+
+
+class RefResolutionError(ValueError):
+    """A $ref points at a file or location that does not exist."""
+
+
+class RefCycleError(ValueError):
+    """A chain of $ref never reaches a value, or --dereference met a recursive schema."""
+
+
+def escape_token(token):
+    return str(token).replace('~', '~0').replace('/', '~1')
+
+
+def unescape_token(token):
+    return token.replace('~1', '/').replace('~0', '~')
+
+
+def format_pointer(tokens):
+    """Turn ('paths', '/v2/market') into '#/paths/~1v2~1market'."""
+    return '#' + quote(''.join('/' + escape_token(token) for token in tokens), safe=POINTER_SAFE)
+
+
+def parse_pointer(fragment):
+    """Turn a URI fragment such as '/paths/~1v2~1market' into its tokens."""
+    fragment = unquote(fragment)
+    if not fragment:
+        return ()
+    if not fragment.startswith('/'):
+        raise RefResolutionError(f"Unsupported fragment #{fragment}: only JSON pointers are resolved")
+    return tuple(unescape_token(token) for token in fragment[1:].split('/'))
+
+
+def cycle_error(targets):
+    return RefCycleError("$ref cycle: " + ' -> '.join(f"{file}{format_pointer(tokens)}" for file, tokens in targets))
+
+
+class RefBundler:
+    """Resolves the $ref graph below one root document.
+
+    Targets are (file, pointer tokens) pairs with absolute file paths.
+    parsed counts the files loaded and resolved the targets looked up.
+    Without a root file only dereferenced() can be used.
+    """
+
+    def __init__(self, root_file=None, dereference=False):
+        self.root_file = os.path.abspath(root_file) if root_file else None
+        self.dereference = dereference
+        self.documents = {}
+        self.nodes = {}
+        # Bundling: where in the output each target was inlined
+        self.homes = {}
+        # Dereferencing: the finished value of each target, and those being built
+        self.values = {}
+        self.building = set()
+
+    @property
+    def parsed(self):
+        return len(self.documents)
+
+    @property
+    def resolved(self):
+        return len(self.nodes)
+
+    def document(self, file):
+        if file not in self.documents:
+            try:
+                self.documents[file] = spec_yaml.load_spec(file)
+            except FileNotFoundError:
+                raise RefResolutionError(f"Referenced file not found: {file}") from None
+        return self.documents[file]
+
+    def target(self, ref, base):
+        """Split a $ref found in file base into an absolute file and pointer tokens."""
+        location, _, fragment = ref.partition('#')
+        file = os.path.normpath(os.path.join(os.path.dirname(base), unquote(location))) if location else base
+        return file, parse_pointer(fragment)
+
+    def node(self, target):
+        """The raw value at a target, looked up once."""
+        if target not in self.nodes:
+            file, tokens = target
+            value = self.document(file)
+            for token in tokens:
+                try:
+                    value = value[int(token)] if isinstance(value, list) else value[token]
+                except (KeyError, IndexError, ValueError, TypeError):
+                    raise RefResolutionError(f"{format_pointer(tokens)} not found in {file}") from None
+            self.nodes[target] = value
+        return self.nodes[target]
+
+    def path_item_target(self, path, target):
+        """Path files hold {path: path item}; point a whole-file reference at the path item."""
+        file, tokens = target
+        if not tokens:
+            document = self.document(file)
+            if isinstance(document, dict) and list(document) == [path]:
+                return file, (path,)
+        return target
+
+    def add_schema_files(self, root, schemas_dir):
+        """Give every file in schemas_dir a place under components/schemas of root.
+
+        References to those files then point at #/components/schemas/<file stem>.
+        """
+        schemas = root.setdefault('components', {}).setdefault('schemas', {})
+        if schemas is None:
+            schemas = root['components']['schemas'] = {}
+        for schema_file in sorted(Path(schemas_dir).glob('*.yaml')):
+            if schema_file.stem not in schemas:
+                schemas[schema_file.stem] = {'$ref': str(schema_file.resolve())}
+                self.homes[str(schema_file.resolve()), ()] = ('components', 'schemas', schema_file.stem)
+
+    def bundle(self, schemas_dir=None):
+        """Return the root document with every $ref resolved."""
+        root = dict(self.document(self.root_file))
+        if schemas_dir is not None and Path(schemas_dir).is_dir():
+            root['components'] = dict(root.get('components') or {})
+            root['components']['schemas'] = dict(root['components'].get('schemas') or {})
+            self.add_schema_files(root, schemas_dir)
+        result = {}
+        for key, value in root.items():
+            if key == 'paths' and isinstance(value, dict):
+                result[key] = {path: self.walk_path_item(path, item) for path, item in value.items()}
+            else:
+                result[key] = self.walk(value, self.root_file, (key,))
+        return result
+
+    def walk_path_item(self, path, item):
+        location = ('paths', path)
+        if isinstance(item, dict) and isinstance(item.get('$ref'), str) and len(item) == 1:
+            target = self.path_item_target(path, self.target(item['$ref'], self.root_file))
+            return self.follow(target, location, {})
+        return self.walk(item, self.root_file, location)
+
+    def walk(self, node, base, location, chain=()):
+        """Copy node from file base, resolving references; location is its place in the output."""
+        if isinstance(node, dict):
+            ref = node.get('$ref')
+            if isinstance(ref, str):
+                siblings = {key: self.walk(value, base, location + (key,))
+                            for key, value in node.items() if key != '$ref'}
+                return self.follow(self.target(ref, base), location, siblings, chain)
+            return {key: self.walk(value, base, location + (key,)) for key, value in node.items()}
+        if isinstance(node, list):
+            return [self.walk(value, base, location + (index,)) for index, value in enumerate(node)]
+        return node
+
+    def follow(self, target, location, siblings, chain=()):
+        """The output for a $ref to target found at location.
+
+        chain holds the targets of the references being followed to reach
+        this one without any value in between; meeting one again is a cycle.
+        """
+        if target in chain:
+            raise cycle_error(chain + (target,))
+        if self.dereference:
+            value = self.dereferenced(target, chain + (target,))
+            if siblings and isinstance(value, dict):
+                value = {**value, **siblings}
+            return value
+
+        file, tokens = target
+        if file == self.root_file:
+            self.check_chain(target, chain)
+        home = tokens if file == self.root_file else self.home(target)
+        if home is None or home == location:
+            self.homes.setdefault(target, location)
+            value = self.node(target)
+            if isinstance(value, dict) and isinstance(value.get('$ref'), str):
+                return self.follow(self.target(value['$ref'], file), location, siblings, chain + (target,))
+            value = self.walk(value, file, location)
+            return {**value, **siblings} if siblings and isinstance(value, dict) else value
+        return {'$ref': format_pointer(home), **siblings}
+
+    def check_chain(self, target, chain):
+        """Raise RefCycleError if following target from reference to reference comes back round."""
+        value = self.node(target)
+        while isinstance(value, dict) and isinstance(value.get('$ref'), str):
+            chain += (target,)
+            target = self.target(value['$ref'], target[0])
+            if target in chain:
+                raise cycle_error(chain + (target,))
+            value = self.node(target)
+
+    def home(self, target):
+        """Where target, or a document containing it, already sits in the bundled output."""
+        if target in self.homes:
+            return self.homes[target]
+        self.node(target)
+        file, tokens = target
+        for length in range(len(tokens) - 1, -1, -1):
+            home = self.homes.get((file, tokens[:length]))
+            if home is None:
+                continue
+            # The bundled copy only keeps the original's layout up to the next $ref
+            node = self.node((file, tokens[:length]))
+            for token in tokens[length:]:
+                if isinstance(node, dict) and '$ref' in node:
+                    return None
+                node = node[int(token)] if isinstance(node, list) else node[token]
+            return home + tokens[length:]
+        return None
+
+    def dereferenced(self, target, chain):
+        """The value of target with all of its own references replaced, built once."""
+        if target not in self.values:
+            if target in self.building:
+                file, tokens = target
+                raise RefCycleError(f"{file}{format_pointer(tokens)} contains itself and cannot be dereferenced; "
+                                    "bundle without --dereference to keep it as a local $ref")
+            self.building.add(target)
+            file, tokens = target
+            self.values[target] = self.walk(self.node(target), file, tokens, chain)
+            self.building.discard(target)
+        return self.values[target]
+
+
+def write_document(document, output_file):
+    """Write YAML, or JSON when output_file ends in .json. Returns True if the file changed."""
+    if str(output_file).endswith('.json'):
+        text = json.dumps(document, indent=2, ensure_ascii=False) + '\n'
+    else:
+        # Dereferenced targets are shared, so repeats are written as YAML aliases
+        text = spec_yaml.dump(document, default_flow_style=False, sort_keys=False, allow_unicode=True)
+    return write_if_changed(output_file, text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bundle a split OpenAPI spec into a single document.')
+    parser.add_argument('root', nargs='?', default=ROOT_FILE, help='root OpenAPI file')
+    parser.add_argument('-o', '--output', default=OUTPUT_FILE, help='bundled .yaml or .json file')
+    parser.add_argument('--dereference', action='store_true',
+                        help='replace every $ref with its target; fails on recursive schemas')
+    parser.add_argument('--schemas-dir', default=SCHEMAS_DIR,
+                        help='directory of schema files added to components/schemas')
+    parser.add_argument('--no-schemas', action='store_true', help='only bundle what the root file references')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    bundler = RefBundler(args.root, dereference=args.dereference)
+    try:
+        document = bundler.bundle(None if args.no_schemas else args.schemas_dir)
+    except (RefResolutionError, RefCycleError) as exc:
+        print(f"Error: {exc}")
+        sys.exit(1)
+    written = write_document(document, args.output)
+    print(f"{'Bundled' if written else 'Unchanged'}: {args.output}")
+    print(f"{bundler.parsed} files parsed, {bundler.resolved} references resolved "
+          f"in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Per-request fingerprints for incremental Postman to OpenAPI conversion.
+Each request item is hashed together with the tag it is converted under.
+Collections whose file is unchanged since the last run are not read at all;
+in the others, items whose hash is unchanged reuse the operation already in
+the previous spec, and the previous spec is patched only where an item was
+added, changed or removed.
+"""
+
+import hashlib
+from pathlib import Path
+
+from spec_components import HTTP_METHODS, fragment_digest
+
+# Bump when the fingerprint document changes shape; converter_version adds
+# a digest of the converter source, so code changes invalidate it as well
+FINGERPRINT_VERSION = 'operations-2'
+
+
+def converter_version(*source_files):
+    """FINGERPRINT_VERSION plus a digest of the converter's source files and this module."""
+    digest = hashlib.sha256()
+    for path in sorted({str(Path(path).resolve()) for path in source_files + (__file__,)}):
+        digest.update(Path(path).read_bytes())
+    return f"{FINGERPRINT_VERSION}-{digest.hexdigest()[:16]}"
+
+
+def item_fingerprint(item, tag):
+    """Hash everything convert_request_to_operation reads from a request item."""
+    fields = {key: item[key] for key in ('name', 'description', 'request') if key in item}
+    return fragment_digest([tag, fields])
+
+
+def operation_digests(spec):
+    """Map 'METHOD /path' to the digest of each operation in a spec."""
+    return {f"{method.upper()} {path}": fragment_digest(operation)
+            for path, methods in (spec or {}).get('paths', {}).items()
+            for method, operation in methods.items() if method in HTTP_METHODS}
+
+
+def item_source(key):
+    return key.split('::', 1)[0]
+
+
+class FingerprintStore:
+    """Fingerprints of the previous run, and those of the run in progress.
+
+    previous_spec is the spec written by the previous run and previous its
+    fingerprint document. Either may be None for a first run; a document
+    written under another version (see converter_version) is ignored.
+    """
+
+    def __init__(self, previous_spec=None, previous=None, version=FINGERPRINT_VERSION):
+        self.version = version
+        self.previous_spec = previous_spec
+        self.previous_paths = (previous_spec or {}).get('paths', {})
+        if previous and previous.get('version') == version:
+            self.previous = previous['items']
+            self.previous_collections = previous.get('collections', {})
+            self.previous_output = previous.get('output')
+            self.previous_dedup = previous.get('dedup', False)
+        else:
+            self.previous = {}
+            self.previous_collections = {}
+            self.previous_output = None
+            self.previous_dedup = False
+        self.items = {}
+        self.collections = {}
+        # Operations converted or reused this run, by item key
+        self.operations = {}
+        self.occurrences = {}
+        self.counts = {'added': 0, 'changed': 0, 'unchanged': 0, 'reused': 0}
+
+    def item_key(self, source, item, tag):
+        """Identify an item across runs by its Postman id, else by folder and name."""
+        base = f"{source}::{item['id']}" if item.get('id') else f"{source}::{tag}/{item.get('name', '')}"
+        occurrence = self.occurrences.get(base, 0)
+        self.occurrences[base] = occurrence + 1
+        return f"{base}#{occurrence}" if occurrence else base
+
+    def _reusable(self, previous):
+        """The previous spec's operation for an item, if it is still the one the item produced."""
+        if previous['path'] is None:
+            return None
+        operation = self.previous_paths.get(previous['path'], {}).get(previous['method'])
+        if operation is not None and fragment_digest(operation) == previous['operation']:
+            return operation
+        return None
+
+    def collection_unchanged(self, source, digest):
+        """Whether source has the file digest it had when the previous spec was written."""
+        previous = self.previous_collections.get(source)
+        return previous is not None and previous['digest'] == digest
+
+    def carry_over(self, source):
+        """Keep the items and frame of an unchanged collection without reading it; returns the frame."""
+        for key, record in self.previous.items():
+            if item_source(key) == source:
+                self.items[key] = record
+                self.counts['unchanged'] += 1
+                self.counts['reused'] += record['path'] is not None
+        self.collections[source] = self.previous_collections[source]
+        return self.collections[source]['frame']
+
+    def record_collection(self, source, digest, spec):
+        """Remember a converted collection's file digest and everything of its spec but the paths."""
+        frame = {key: value for key, value in spec.items() if key != 'paths'}
+        self.collections[source] = {'digest': digest, 'frame': frame}
+        return frame
+
+    def request_converter(self, converter, source):
+        """Return a convert_request callable for PostmanToOpenAPI.walk_items covering one collection."""
+        def convert_request(item, tag):
+            key = self.item_key(source, item, tag)
+            fingerprint = item_fingerprint(item, tag)
+            previous = self.previous.get(key)
+            result = None
+            if previous is None:
+                self.counts['added'] += 1
+            elif previous['fingerprint'] != fingerprint:
+                self.counts['changed'] += 1
+            else:
+                self.counts['unchanged'] += 1
+                operation = self._reusable(previous)
+                if operation is not None:
+                    result = (previous['path'], previous['method'], operation)
+                    self.counts['reused'] += 1
+            if result is None:
+                result = converter.convert_request_to_operation(item, tag)
+            path, method, operation = result if result else (None, None, None)
+            self.items[key] = {
+                "fingerprint": fingerprint,
+                "path": path,
+                "method": method,
+                "operation": fragment_digest(operation) if result else None
+            }
+            if result:
+                self.operations[key] = operation
+            return result
+        return convert_request
+
+    def can_patch(self, output_digest, dedup):
+        """Whether the previous spec is exactly what the previous run wrote, undeduplicated.
+
+        Deduplicated specs hold $refs in place of the operations the items
+        produced, so they are always rebuilt.
+        """
+        return (self.previous_spec is not None and output_digest is not None
+                and output_digest == self.previous_output and not dedup and not self.previous_dedup)
+
+    def touched_slots(self):
+        """(path, method) slots where an item was added, removed, changed or converted differently."""
+        # Ordered, so new paths are appended the same way on every run
+        slots = {}
+        for key in list(self.items) + [key for key in self.previous if key not in self.items]:
+            before, after = self.previous.get(key), self.items.get(key)
+            if before == after:
+                continue
+            for record in (before, after):
+                if record is not None and record['path'] is not None:
+                    slots.setdefault((record['path'], record['method']), None)
+        return list(slots)
+
+    def slot_operation(self, slot, sources):
+        """The operation a full conversion and merge would put in slot, False for none, None if unknown.
+
+        The first collection defining the slot wins, and within it the last
+        item, as in merge_specs and walk_items.
+        """
+        owners = {}
+        for key, record in self.items.items():
+            if (record['path'], record['method']) == slot:
+                owners.setdefault(item_source(key), []).append(key)
+        for source in sources:
+            if source in owners:
+                key = owners[source][-1]
+                if key in self.operations:
+                    return self.operations[key]
+                # An item of a collection that was not read is only known if it held the slot before
+                return self._reusable(self.items[key])
+        return False
+
+    def patch(self, spec, frame, sources):
+        """Apply this run's changes to spec, a fresh copy of the previous spec, in place.
+
+        frame supplies everything but the paths. Paths and methods keep their
+        place; new ones are appended. Returns the number of slots patched, or
+        None when an operation cannot be recovered without reading a
+        collection again, in which case spec must not be used.
+        """
+        slots = self.touched_slots()
+        operations = {slot: self.slot_operation(slot, sources) for slot in slots}
+        if any(operation is None for operation in operations.values()):
+            return None
+        for key, value in frame.items():
+            spec[key] = value
+        paths = spec.setdefault('paths', {})
+        for (path, method), operation in operations.items():
+            if operation is False:
+                methods = paths.get(path, {})
+                methods.pop(method, None)
+                if not methods:
+                    paths.pop(path, None)
+            else:
+                paths.setdefault(path, {})[method] = operation
+        return len(slots)
+
+    def document(self, output_digest=None, dedup=False):
+        """The fingerprint document to store next to the output."""
+        return {"version": self.version, "items": self.items, "collections": self.collections,
+                "output": output_digest, "dedup": dedup}
+
+    def change_report(self, spec):
+        """Compare spec with the previous one, by item and by operation."""
+        removed_items = sum(1 for key in self.previous if key not in self.items)
+        before, after = operation_digests(self.previous_spec), operation_digests(spec)
+        return {
+            "items": dict(self.counts, removed=removed_items),
+            "operations": {
+                "added": [key for key in after if key not in before],
+                "changed": [key for key in after if key in before and after[key] != before[key]],
+                "removed": [key for key in before if key not in after]
+            }
+        }
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Incremental reader for Postman Collection v2 files.
+Walks the item tree straight from the file and hands out one request item at
+a time. Response examples and other keys the converter never reads are
+skipped without being decoded, so memory follows the folder depth rather
+than the collection size.
+"""
+
+import json
+import re
+
+CHUNK_SIZE = 1024 * 1024
+
+# Item keys the converter reads; everything else (response examples, events,
+# protocol settings) is skipped
+ITEM_KEYS = {'name', 'description', 'request'}
+
+STRUCTURAL_PATTERN = re.compile(r'["{}\[\]]')
+STRING_END_PATTERN = re.compile(r'["\\]')
+STRING_BODY_PATTERN = re.compile(r'[^"\\]*+(?:\\.[^"\\]*+)*+"', re.DOTALL)
+SCALAR_END_PATTERN = re.compile(r'[\s,}\]]')
+WHITESPACE_PATTERN = re.compile(r'\s*')
+
+_END = object()
+
+
+class JsonReader:
+    """Pull reader over a JSON text stream that decodes only the values asked for."""
+
+    def __init__(self, stream, chunk_size=CHUNK_SIZE):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+        self.consumed = 0
+
+    def offset(self):
+        """Character offset of pos in the whole stream, for error messages."""
+        return self.consumed + self.pos
+
+    def _more(self):
+        """Append the next chunk, dropping text before pos. Returns how far offsets shifted."""
+        chunk = self.stream.read(self.chunk_size)
+        if not chunk:
+            raise ValueError(f"Unexpected end of JSON input at {self.offset()}")
+        shift = self.pos
+        self.buffer = self.buffer[shift:] + chunk
+        self.pos = 0
+        self.consumed += shift
+        return shift
+
+    def peek(self):
+        """Skip whitespace and return the next character."""
+        while True:
+            self.pos = WHITESPACE_PATTERN.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            self._more()
+
+    def expect(self, chars):
+        """Consume and return the next character, which must be one of chars."""
+        char = self.peek()
+        if char not in chars:
+            raise ValueError(f"Expected one of {chars!r} at {self.offset()}, found {char!r}")
+        self.pos += 1
+        return char
+
+    def _string_end(self, i, keep):
+        """Return the offset just past the closing quote of a string whose body starts at i."""
+        match = STRING_BODY_PATTERN.match(self.buffer, i)
+        if match:
+            return match.end()
+        # The string runs past the buffer; step through its escapes while reading on
+        while True:
+            match = STRING_END_PATTERN.search(self.buffer, i)
+            if match and match.group() == '"':
+                return match.end()
+            if match and match.end() < len(self.buffer):
+                # Skip the escaped character
+                i = match.end() + 1
+                continue
+            # Out of text, or a backslash whose escaped character is in the next chunk
+            resume = len(self.buffer) if match is None else match.start()
+            if not keep:
+                self.pos = resume
+            i = resume - self._more()
+
+    def _value_end(self, keep):
+        """Return the offset just past the value at pos.
+
+        With keep false, text is dropped from the buffer as the scan passes
+        it, so skipped values never have to fit in memory.
+        """
+        first = self.peek()
+        i = self.pos
+        if first not in '{["':
+            while True:
+                match = SCALAR_END_PATTERN.search(self.buffer, i)
+                if match:
+                    return match.start()
+                i = len(self.buffer) - self._more()
+        depth = 0
+        while True:
+            match = STRUCTURAL_PATTERN.search(self.buffer, i)
+            if match is None:
+                if not keep:
+                    self.pos = len(self.buffer)
+                i = len(self.buffer) - self._more()
+                continue
+            char = match.group()
+            i = match.end()
+            if char == '"':
+                i = self._string_end(i, keep)
+                if depth == 0:
+                    return i
+            elif char in '{[':
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return i
+
+    def read_value(self):
+        """Decode and return the value at pos."""
+        end = self._value_end(keep=True)
+        value = json.loads(self.buffer[self.pos:end])
+        self.pos = end
+        return value
+
+    def skip_value(self):
+        """Move past the value at pos without decoding it."""
+        self.pos = self._value_end(keep=False)
+
+    def iter_object(self):
+        """Yield the keys of the object at pos.
+
+        The caller must read, skip or descend into each key's value before
+        asking for the next key.
+        """
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            if self.peek() != '"':
+                raise ValueError(f"Expected an object key at {self.offset()}")
+            key = self.read_value()
+            self.expect(':')
+            yield key
+            if self.expect(',}') == '}':
+                return
+
+    def iter_array(self):
+        """Yield once per element of the array at pos; the caller consumes each element."""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield
+            if self.expect(',]') == ']':
+                return
+
+
+def iter_item_events(items, parent=None):
+    """Yield the iter_collection events for an already loaded item list.
+
+    The tree is walked depth first with an explicit stack, so nesting depth is
+    not limited by the interpreter's recursion limit.
+    """
+    stack = [(iter(items), parent)]
+    while stack:
+        elements, folder = stack[-1]
+        item = next(elements, _END)
+        if item is _END:
+            stack.pop()
+            if stack:
+                yield 'end', folder, stack[-1][1]
+        elif 'item' in item and isinstance(item['item'], list):
+            yield 'folder', item, folder
+            stack.append((iter(item['item']), item))
+        elif 'request' in item:
+            yield 'request', item, folder
+
+
+def _finish_folder(reader, folder, keys):
+    """Read the keys that follow a streamed folder's items into folder."""
+    for key in keys:
+        if key in ITEM_KEYS:
+            folder[key] = reader.read_value()
+        else:
+            reader.skip_value()
+
+
+def _iter_items(reader):
+    """Yield events for the item array at pos, holding only the open folders in memory."""
+    # One frame per open item array: its element iterator, the folder that
+    # owns it (None at the top) and that folder's remaining object keys
+    stack = [(reader.iter_array(), None, None)]
+    while stack:
+        elements, folder, folder_keys = stack[-1]
+        if next(elements, _END) is _END:
+            stack.pop()
+            if folder is not None:
+                # Keys after "item", e.g. a folder description
+                _finish_folder(reader, folder, folder_keys)
+                yield 'end', folder, stack[-1][1]
+            continue
+        if reader.peek() != '{':
+            reader.skip_value()
+            continue
+        record = {}
+        keys = reader.iter_object()
+        for key in keys:
+            if key == 'item' and 'name' in record and reader.peek() == '[':
+                # Postman writes a folder's name before its items, so its
+                # children can be streamed with the tag already known
+                yield 'folder', record, folder
+                stack.append((reader.iter_array(), record, keys))
+                break
+            if key in ITEM_KEYS or key == 'item':
+                record[key] = reader.read_value()
+            else:
+                reader.skip_value()
+        else:
+            if isinstance(record.get('item'), list):
+                # Folder items arrived before its name and were loaded whole
+                yield 'folder', record, folder
+                yield from iter_item_events(record['item'], record)
+                yield 'end', record, folder
+            elif 'request' in record:
+                yield 'request', record, folder
+
+
+def iter_collection(stream, chunk_size=CHUNK_SIZE):
+    """Yield (kind, item, parent) events for a Postman collection read from a text stream.
+
+    kind is 'info' (item is the collection info), 'folder' when a folder's
+    children start, 'request' for each request item and 'end' once a folder
+    and all its keys have been read. parent is the enclosing folder, or None
+    at the top level.
+    """
+    reader = JsonReader(stream, chunk_size)
+    for key in reader.iter_object():
+        if key == 'info':
+            yield 'info', reader.read_value(), None
+        elif key == 'item' and reader.peek() == '[':
+            yield from _iter_items(reader)
+        else:
+            reader.skip_value()
@@ -4,32 +4,46 @@ Comprehensive Megaport API Documentation Parser
 Extracts all endpoint information from the HTML documentation
 """
 
-import re
+import argparse
 import json
+from bisect import bisect_right
 from pathlib import Path
 from collections import defaultdict
 
-def extract_endpoints_from_html(html_file_path):
+from doc_scanner import ENGINES, load_scan
+
+def link_urls_to_headers(scan, header_offsets):
+    """Map each header offset to the first staging URL inside the section around it.
+
+    header_offsets must be sorted. Each URL goes to the nearest header before
+    it, and only if it lies inside that header's innermost section. This
+    costs O((U+E) log E) and gives the same mapping on every run.
+    """
+    sections = scan.sections
+    section_ends = []
+    for offset in header_offsets:
+        index = sections.innermost(offset)
+        section_ends.append(sections.ends[index] if index is not None else len(scan.content))
+    
+    urls = {}
+    for url_offset, url in scan.urls:
+        i = bisect_right(header_offsets, url_offset) - 1
+        if i >= 0 and url_offset < section_ends[i]:
+            urls.setdefault(header_offsets[i], url)
+    return urls
+
+def extract_endpoints_from_html(html_file_path, engine='text'):
     """Extract all endpoint information from the Megaport API HTML documentation"""
     
-    with open(html_file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
+    scan = load_scan(html_file_path, engine)
     
     endpoints = []
     
-    # Pattern 1: Extract endpoint request sections  
-    # Looking for patterns like: <span class="sc-fzoaKM METHOD">METHOD</span><span class="sc-fzomuh...">ENDPOINT_NAME</span>
-    method_pattern = r'<span class="sc-fzoaKM [^"]+">(\w+)</span><span class="sc-fzomuh eaYntv documentation-core-item-request-name">([^<]+)</span>'
-    method_matches = re.findall(method_pattern, content)
-    
-    # Pattern 2: Extract URLs
-    # Looking for patterns like: https://api-staging.megaport.com/v[X]/...
-    url_pattern = r'https://api-staging\.megaport\.com(/v\d+/[^"<\s]+)'
-    url_matches = re.findall(url_pattern, content)
-    
-    # Pattern 3: Extract navigation item endpoints (GET, POST, PUT, DELETE with names)
-    nav_pattern = r'<div class="sc-fzplgP ([^"]+)">(\w+)</div><div class="sc-fzonjX jMaMuX documentation-core-list__item-name">([^<]+)</div>'
-    nav_matches = re.findall(nav_pattern, content)
+    # Method/name pairs, URLs and navigation items all come from the shared
+    # document scan instead of separate passes over the file
+    method_matches = [(method, name) for _, method, name in scan.request_headers]
+    url_matches = [url for _, url in scan.urls]
+    nav_matches = [(css_class, method, name) for _, css_class, method, name in scan.nav_items]
     
     # Combine method matches with navigation matches
     print(f"Found {len(method_matches)} method/name pairs")
@@ -55,37 +69,28 @@ def extract_endpoints_from_html(html_file_path):
         })
     
     # Extract section IDs and their descriptions
-    section_pattern = r'<section id="([^"]+)"[^>]*>.*?<h3[^>]*>.*?<span class="sc-fzoaKM ([^"]+)">(\w+)</span><span[^>]*>([^<]+)</span>'
-    section_matches = re.findall(section_pattern, content, re.DOTALL)
+    section_matches = scan.section_headers()
     
     print(f"Found {len(section_matches)} section definitions")
     
+    # Match each URL to the section header it appears under
+    header_urls = link_urls_to_headers(scan, [offset for offset, *_ in section_matches])
+    
     # Create a more comprehensive list
     endpoint_dict = {}
-    for section_id, css_class, method, name in section_matches:
+    for offset, section_id, css_class, method, name in section_matches:
         key = f"{method}_{name.strip()}"
         endpoint_dict[key] = {
             'method': method,
             'name': name.strip(),
             'section_id': section_id,
-            'url': None
+            'url': header_urls.get(offset)
         }
     
-    # Try to match URLs to endpoints
-    for url in set(url_matches):
-        # Try to find which endpoint this URL belongs to
-        for key, endpoint in endpoint_dict.items():
-            if endpoint['url'] is None:
-                endpoint['url'] = url
-                break
-    
     # Extract all paths from content
     # Looking for v2, v3, v4 endpoints
-    path_pattern = r'/v(\d+)/([^\s"\'<>]+)'
-    all_paths = re.findall(path_pattern, content)
-    
     paths_by_version = defaultdict(set)
-    for version, path in all_paths:
+    for _, version, path in scan.version_paths:
         clean_path = path.rstrip('/').rstrip(',').rstrip('"').rstrip("'")
         paths_by_version[version].add(clean_path)
     
@@ -94,8 +99,7 @@ def extract_endpoints_from_html(html_file_path):
         print(f"  v{version}: {len(paths_by_version[version])} unique paths")
     
     # Extract endpoint descriptions from paragraphs
-    desc_pattern = r'<p><span>([^<]+)</span></p>'
-    descriptions = re.findall(desc_pattern, content)
+    descriptions = [text for _, text in scan.descriptions]
     
     return {
         'endpoints': list(endpoint_dict.values()),
@@ -106,7 +110,12 @@ def extract_endpoints_from_html(html_file_path):
     }
 
 def main():
-    html_file = Path('/home/test/APITestingTask/docs/api_docs.html')
+    parser = argparse.ArgumentParser(description='Extract all endpoint information from the API documentation HTML.')
+    parser.add_argument('--engine', choices=ENGINES, default='text',
+                        help='text decodes the whole file; mmap runs bytes patterns over a memory map')
+    args = parser.parse_args()
+    
+    html_file = Path(__file__).parent.parent / 'docs' / 'api_docs.html'
     
     if not html_file.exists():
         print(f"Error: {html_file} not found")
@@ -115,10 +124,10 @@ def main():
     print(f"Parsing {html_file}...")
     print(f"File size: {html_file.stat().st_size:,} bytes")
     
-    results = extract_endpoints_from_html(html_file)
+    results = extract_endpoints_from_html(html_file, args.engine)
     
     # Save results
-    output_file = Path('/home/test/APITestingTask/docs/parsed_endpoints.json')
+    output_file = Path(__file__).parent.parent / 'docs' / 'parsed_endpoints.json'
     with open(output_file, 'w') as f:
         json.dump(results, f, indent=2)
     
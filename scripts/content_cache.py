@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Content-hash cache helpers for the spec toolchain.
+Keys derived results on the SHA-256 of their inputs plus a producer version.
+"""
+
+import argparse
+import hashlib
+import os
+import stat
+import sys
+import tempfile
+from pathlib import Path
+
+DEFAULT_CACHE_DIR = Path(__file__).parent.parent / '.cache'
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Read once at import: os.umask can only be read by setting it, which would
+# race with files created on other threads
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def file_digest(path):
+    """Return the hex SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def text_digest(text):
+    """Return the hex SHA-256 of a str encoded as UTF-8."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def file_mode(path):
+    """The permission bits path should be written with: its current ones, or the umask default for a new file."""
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
+
+
+def atomic_write(path, data):
+    """Write str or bytes to path through a temporary file and an atomic rename.
+
+    mkstemp creates the temporary file as 0600, so it is given the mode of
+    the file it replaces (or the umask default) before the rename.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data.encode('utf-8') if isinstance(data, str) else data)
+        os.chmod(tmp_path, file_mode(path))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def write_if_changed(path, data):
+    """Atomically write data unless path already holds exactly it. Returns True if written."""
+    path = Path(path)
+    encoded = data.encode('utf-8') if isinstance(data, str) else data
+    try:
+        if path.stat().st_size == len(encoded) and path.read_bytes() == encoded:
+            return False
+    except FileNotFoundError:
+        pass
+    atomic_write(path, encoded)
+    return True
+
+
+class ContentCache:
+    """Text or binary entries stored under cache_dir/namespace, keyed on an input digest and a version."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, namespace='default'):
+        self.directory = Path(cache_dir) / namespace
+
+    def entry_path(self, digest, version):
+        return self.directory / f"{version}-{digest}"
+
+    def load(self, digest, version):
+        """Return the cached text for digest and version, or None."""
+        try:
+            return self.entry_path(digest, version).read_text(encoding='utf-8')
+        except FileNotFoundError:
+            return None
+
+    def load_bytes(self, digest, version):
+        """Return the cached bytes for digest and version, or None."""
+        try:
+            return self.entry_path(digest, version).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def store(self, digest, version, data):
+        """Store str or bytes for digest and version."""
+        atomic_write(self.entry_path(digest, version), data)
+
+
+def check_modes(directory):
+    """Return a list of problems with the modes atomic_write leaves behind in directory."""
+    problems = []
+    path = Path(directory) / 'mode-check.txt'
+    atomic_write(path, 'new\n')
+    if file_mode(path) != 0o666 & ~_UMASK:
+        problems.append(f"new file is {file_mode(path):o}, expected {0o666 & ~_UMASK:o}")
+    for mode in (0o640, 0o644, 0o755):
+        os.chmod(path, mode)
+        write_if_changed(path, f"rewritten {mode:o}\n")
+        if file_mode(path) != mode:
+            problems.append(f"rewritten {mode:o} file is {file_mode(path):o}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Content-hash cache helpers for the spec toolchain.')
+    parser.add_argument('--check', action='store_true', help='check that atomic writes keep file modes')
+    args = parser.parse_args()
+
+    if not args.check:
+        parser.print_help()
+        return
+    with tempfile.TemporaryDirectory() as directory:
+        problems = check_modes(directory)
+    for problem in problems:
+        print(problem)
+    print(f"Atomic write modes: {'ok' if not problems else f'{len(problems)} problems'}")
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Shared single-pass scanner for the Megaport API documentation HTML.
+Walks the Postman export once and records every token the doc parsers need.
+"""
+
+import mmap
+import re
+from bisect import bisect_right
+from pathlib import Path
+
+STAGING_HOST = 'https://api-staging.megaport.com'
+
+
+class PatternPair:
+    """A regex compiled both for str documents and for bytes-like ones such as an mmap.
+
+    Calling it with the document returns the variant matching its type.
+    """
+
+    def __init__(self, pattern):
+        self.text = re.compile(pattern)
+        self.binary = re.compile(pattern.encode('utf-8'))
+
+    def __call__(self, content):
+        return self.text if isinstance(content, str) else self.binary
+
+
+def decode(value):
+    """Return captured text as str, decoding UTF-8 bytes from a binary document."""
+    return value if isinstance(value, str) else value.decode('utf-8')
+
+
+# Cheap openers the scanner stops at. Each one is expanded in place by the
+# full pattern below, so matches of different patterns may overlap exactly
+# as they would with separate findall passes. The alternation has no groups
+# so the regex engine can keep its literal-prefix fast path.
+TOKEN_PATTERN = PatternPair(
+    r'<section[\s>]|</section>|<h3|<span class="sc-fzoaKM |<div class="sc-fzplgP |<p><span>'
+    r'|/v\d+/'
+)
+# Openers are told apart by their first three characters; anything else is a /vN/ path
+TOKEN_KINDS = {
+    '<se': 'section_open',
+    '</s': 'section_close',
+    '<h3': 'h3',
+    '<sp': 'request_header',
+    '<di': 'nav_item',
+    '<p>': 'paragraph',
+}
+TOKEN_KINDS_BINARY = {opener.encode('ascii'): kind for opener, kind in TOKEN_KINDS.items()}
+
+SECTION_OPEN_PATTERN = PatternPair(r'<section id="([^"]+)"[^>]*>')
+H3_PATTERN = PatternPair(r'<h3[^>]*>')
+HEADER_SPAN_PATTERN = PatternPair(r'<span class="sc-fzoaKM ([^"]+)">(\w+)</span><span[^>]*>([^<]+)</span>')
+REQUEST_HEADER_PATTERN = PatternPair(r'<span class="sc-fzoaKM [^"]+">(\w+)</span><span class="sc-fzomuh eaYntv documentation-core-item-request-name">([^<]+)</span>')
+NAV_ITEM_PATTERN = PatternPair(r'<div class="sc-fzplgP ([^"]+)">(\w+)</div><div class="sc-fzonjX jMaMuX documentation-core-list__item-name">([^<]+)</div>')
+PARAGRAPH_PATTERN = PatternPair(r'<p><span>([^<]+)</span></p>')
+STAGING_URL_PATTERN = PatternPair(r'https://api-staging\.megaport\.com(/v\d+/[^"<\s]+)')
+VERSION_PATH_PATTERN = PatternPair(r'/v(\d+)/([^\s"\'<>]+)')
+
+
+class SectionIndex:
+    """Offsets of every <section id=...> in document order, with nesting.
+
+    Only offsets are kept; section bodies are never copied out of the
+    document. start/end delimit the body between the open and close tags and
+    parents[i] is the index of the nearest enclosing section with an id.
+    """
+
+    def __init__(self):
+        self.ids = []
+        self.tag_starts = []
+        self.starts = []
+        self.ends = []
+        self.parents = []
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        """Yield (section_id, start, end) for every section."""
+        return zip(self.ids, self.starts, self.ends)
+
+    def indices_for(self, section_ids):
+        """Return the indices of sections whose id is in section_ids, in document order."""
+        wanted = set(section_ids)
+        return [i for i, section_id in enumerate(self.ids) if section_id in wanted]
+
+    def innermost(self, offset):
+        """Return the index of the innermost section whose body contains offset, or None."""
+        i = bisect_right(self.starts, offset) - 1
+        while i is not None and i >= 0:
+            if self.ends[i] > offset:
+                return i
+            i = self.parents[i]
+        return None
+
+
+class DocScan:
+    """Tokens recorded by one pass over the documentation HTML, in document order."""
+
+    def __init__(self, content):
+        self.content = content
+        self.sections = SectionIndex()
+        self.h3_tags = []           # (tag_start, tag_end)
+        self.header_spans = []      # (offset, end, css_class, method, name), may overlap
+        self.request_headers = []   # (offset, method, name)
+        self.nav_items = []         # (offset, css_class, method, name)
+        self.urls = []              # (offset, path) for staging URLs
+        self.version_paths = []     # (offset, version, path)
+        self.descriptions = []      # (offset, text) from <p><span> paragraphs
+
+    def section_headers(self):
+        """Return (offset, section_id, css_class, method, name) for each section and the first header after it.
+
+        Gives the same matches as a findall of
+        <section id="..."[^>]*>.*?<h3[^>]*>.*?<span class="sc-fzoaKM ...">M</span><span[^>]*>N</span>
+        but walks the recorded offsets once with forward-only cursors, so a
+        section without a following header cannot rescan the rest of the file.
+        offset is where the header span starts.
+        """
+        sections = self.sections
+        h3_tags = self.h3_tags
+        header_spans = self.header_spans
+        results = []
+        h3_cursor = span_cursor = 0
+        resume = 0
+        for i, tag_start in enumerate(sections.tag_starts):
+            if tag_start < resume:
+                continue
+            # First <h3> after the section open tag
+            while h3_cursor < len(h3_tags) and h3_tags[h3_cursor][0] < sections.starts[i]:
+                h3_cursor += 1
+            if h3_cursor == len(h3_tags):
+                break
+            # First header span after that <h3> tag
+            h3_end = h3_tags[h3_cursor][1]
+            while span_cursor < len(header_spans) and header_spans[span_cursor][0] < h3_end:
+                span_cursor += 1
+            if span_cursor == len(header_spans):
+                break
+            offset, end, css_class, method, name = header_spans[span_cursor]
+            results.append((offset, sections.ids[i], css_class, method, name))
+            resume = end
+        return results
+
+
+def scan_document(content):
+    """Walk the HTML once and return a DocScan with all recognised tokens.
+
+    content may be a str or a bytes-like object such as an mmap; for the
+    latter all offsets are byte offsets and only captured groups are decoded.
+    """
+    scan = DocScan(content)
+    if isinstance(content, str):
+        token_kinds = TOKEN_KINDS
+        host = STAGING_HOST
+    else:
+        token_kinds = TOKEN_KINDS_BINARY
+        host = STAGING_HOST.encode('ascii')
+    section_open_pattern = SECTION_OPEN_PATTERN(content)
+    h3_pattern = H3_PATTERN(content)
+    header_span_pattern = HEADER_SPAN_PATTERN(content)
+    request_header_pattern = REQUEST_HEADER_PATTERN(content)
+    nav_item_pattern = NAV_ITEM_PATTERN(content)
+    paragraph_pattern = PARAGRAPH_PATTERN(content)
+    staging_url_pattern = STAGING_URL_PATTERN(content)
+    version_path_pattern = VERSION_PATH_PATTERN(content)
+    # Non-overlapping findall semantics are kept per pattern by resuming
+    # each one only after the end of its own previous match.
+    header_resume = nav_resume = paragraph_resume = url_resume = path_resume = 0
+    host_length = len(host)
+    sections = scan.sections
+    # Stack of open sections as (index, identified). Anonymous sections only
+    # take part in nesting and carry the index of their nearest identified
+    # ancestor instead of their own.
+    open_sections = []
+
+    for token in TOKEN_PATTERN(content).finditer(content):
+        pos = token.start()
+        kind = token_kinds.get(content[pos:pos + 3], 'version_path')
+
+        if kind == 'section_open':
+            parent = open_sections[-1][0] if open_sections else None
+            match = section_open_pattern.match(content, pos)
+            if match:
+                sections.ids.append(decode(match.group(1)))
+                sections.tag_starts.append(pos)
+                sections.starts.append(match.end())
+                sections.ends.append(len(content))
+                sections.parents.append(parent)
+                open_sections.append((len(sections.ids) - 1, True))
+            else:
+                open_sections.append((parent, False))
+        elif kind == 'section_close':
+            if open_sections:
+                index, identified = open_sections.pop()
+                if identified:
+                    sections.ends[index] = pos
+        elif kind == 'h3':
+            match = h3_pattern.match(content, pos)
+            if match:
+                scan.h3_tags.append((pos, match.end()))
+        elif kind == 'request_header':
+            match = header_span_pattern.match(content, pos)
+            if match:
+                scan.header_spans.append((pos, match.end(), decode(match.group(1)),
+                                          decode(match.group(2)), decode(match.group(3))))
+            if pos >= header_resume:
+                match = request_header_pattern.match(content, pos)
+                if match:
+                    scan.request_headers.append((pos, decode(match.group(1)), decode(match.group(2))))
+                    header_resume = match.end()
+        elif kind == 'nav_item':
+            if pos >= nav_resume:
+                match = nav_item_pattern.match(content, pos)
+                if match:
+                    scan.nav_items.append((pos, decode(match.group(1)), decode(match.group(2)),
+                                           decode(match.group(3))))
+                    nav_resume = match.end()
+        elif kind == 'paragraph':
+            if pos >= paragraph_resume:
+                match = paragraph_pattern.match(content, pos)
+                if match:
+                    scan.descriptions.append((pos, decode(match.group(1))))
+                    paragraph_resume = match.end()
+        elif kind == 'version_path':
+            url_start = pos - host_length
+            if url_start >= url_resume and content[url_start:pos] == host:
+                match = staging_url_pattern.match(content, url_start)
+                if match:
+                    scan.urls.append((url_start, decode(match.group(1))))
+                    url_resume = match.end()
+            if pos >= path_resume:
+                match = version_path_pattern.match(content, pos)
+                if match:
+                    scan.version_paths.append((pos, decode(match.group(1)), decode(match.group(2))))
+                    path_resume = match.end()
+
+    return scan
+
+
+ENGINES = ('text', 'mmap')
+
+_scan_cache = {}
+
+
+def map_file(path):
+    """Memory-map a file read-only; pages are shared with other processes through the page cache."""
+    with open(path, 'rb') as f:
+        if f.seek(0, 2) == 0:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def read_document(path, engine='text'):
+    """Return a documentation file as a str ('text') or a read-only memory map ('mmap')."""
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown scan engine: {engine}")
+    if engine == 'mmap':
+        return map_file(path)
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def clear_scan_cache():
+    """Forget the cached scan, e.g. to time a cold parse."""
+    _scan_cache.clear()
+
+
+def load_scan(html_file_path, engine='text'):
+    """Read and scan a documentation file, reusing the scan while the file is unchanged.
+
+    The 'text' engine decodes the whole file into a str. The 'mmap' engine
+    runs bytes patterns straight over a memory map of it and decodes only the
+    captured groups.
+    """
+    path = Path(html_file_path).resolve()
+    stat = path.stat()
+    key = (str(path), stat.st_mtime_ns, stat.st_size, engine)
+    scan = _scan_cache.get(key)
+    if scan is None:
+        scan = scan_document(read_document(path, engine))
+        _scan_cache.clear()
+        _scan_cache[key] = scan
+    return scan
@@ -4,10 +4,18 @@ Generate complete OpenAPI specification files from parsed endpoint data.
 Creates modular OpenAPI 3.0.3 specs with proper folder structure.
 """
 
+import argparse
 import json
 import re
 from pathlib import Path
-import yaml
+
+import spec_yaml
+from spec_components import deduplicate_components, rebase_local_refs
+from tag_classifier import RULES_FILE, default_classifier, use_rules_file
+
+# Path files go next to megaport-api.yaml, apart from specs/paths, which
+# split_openapi fills with the Postman conversion's tag folders
+PATHS_DIRNAME = 'doc-paths'
 
 def sanitize_filename(name):
     """Convert endpoint name to valid filename"""
@@ -26,39 +34,13 @@ def get_operation_id(method, name):
     return f"{method.lower()}{clean_name}"
 
 def get_tag_from_name(name):
-    """Extract appropriate tag from endpoint name"""
-    name_lower = name.lower()
-    
-    if 'login' in name_lower or 'password' in name_lower or 'token' in name_lower:
-        return 'Authentication'
-    elif 'mfa' in name_lower or 'multi-factor' in name_lower:
-        return 'MFA'
-    elif 'employee' in name_lower or 'user' in name_lower:
-        return 'Users'
-    elif 'market' in name_lower:
-        return 'Markets'
-    elif 'partner' in name_lower:
-        return 'Partners'
-    elif 'ix' in name_lower:
-        return 'IX'
-    elif 'port' in name_lower:
-        return 'Ports'
-    elif 'vxc' in name_lower:
-        return 'VXCs'
-    elif 'aws' in name_lower:
-        return 'AWS'
-    elif 'azure' in name_lower:
-        return 'Azure'
-    elif 'google' in name_lower:
-        return 'Google'
-    elif 'sap' in name_lower:
-        return 'SAP'
-    else:
-        return 'General'
+    """Extract appropriate tag from endpoint name, using the rules in tag_rules.yaml"""
+    return default_classifier().classify(name)[0]
 
 def extract_path_parameters(url):
     """Extract path parameters from URL"""
-    # Match :param or {param} styles
+    # Match :param or {param} styles, in the path only; ?key={value} is a query parameter
+    url = url.split('?')[0]
     params = []
     
     # Find :param style
@@ -195,10 +177,31 @@ def generate_path_spec(endpoint):
         'operation': operation
     }
 
-def generate_all_specs(endpoints):
-    """Generate all OpenAPI specification files"""
+def load_main_components():
+    """Return the components section of the main OpenAPI spec, or an empty dict"""
+    base_path = Path(__file__).parent.parent
+    main_spec_path = base_path / 'specs' / 'megaport-api.yaml'
+    
+    with open(main_spec_path, 'r') as f:
+        content = f.read()
+    
+    # Older specs include the path files with !include, so only the components part is parsed
+    if 'components:' not in content:
+        return {}
+    return spec_yaml.safe_load('components:' + content.split('components:', 1)[1])['components'] or {}
+
+def generate_all_specs(endpoints, components=None):
+    """Generate all OpenAPI specification files
+
+    When components is given, repeated responses, parameters and request
+    bodies are moved into it and the path files refer to them with $ref.
+    Each path file holds one Path Item Object, which megaport-api.yaml
+    references whole. Path files are standalone documents, so their
+    references point at the components of megaport-api.yaml by file.
+    """
     base_path = Path(__file__).parent.parent
-    paths_dir = base_path / 'specs' / 'paths'
+    paths_dir = base_path / 'specs' / PATHS_DIRNAME
+    paths_dir.mkdir(exist_ok=True)
     
     # Group endpoints by path
     path_specs = {}
@@ -217,8 +220,12 @@ def generate_all_specs(endpoints):
             path_specs[path][method] = operation
             all_tags.update(operation.get('tags', []))
     
+    if components is not None:
+        replaced = deduplicate_components({'paths': path_specs, 'components': components})
+        print("Deduplicated " + ", ".join(f"{count} {section}" for section, count in replaced.items()))
+    
     # Generate path files
-    path_files = []
+    path_files = {}
     for path, methods in path_specs.items():
         # Create filename from path
         filename = path.replace('/', '-').replace('{', '').replace('}', '').strip('-')
@@ -226,21 +233,23 @@ def generate_all_specs(endpoints):
             filename = 'root'
         
         filepath = paths_dir / f"{filename}.yaml"
-        path_files.append(f"paths/{filename}.yaml")
-        
-        # Create path spec
-        path_content = {path: methods}
+        path_files[path] = f"{PATHS_DIRNAME}/{filename}.yaml"
         
-        # Write file
+        # Write the path item itself, so the whole-file $ref resolves to it;
+        # '#/components/...' would resolve against the path file itself
+        rebase_local_refs(methods, '../megaport-api.yaml')
         with open(filepath, 'w') as f:
-            yaml.dump(path_content, f, default_flow_style=False, sort_keys=False)
+            spec_yaml.dump(methods, f, default_flow_style=False, sort_keys=False)
         
         print(f"Created: {filepath.relative_to(base_path)}")
     
     return path_files, sorted(all_tags)
 
-def update_main_spec(path_files, tags):
-    """Update main OpenAPI specification file"""
+def update_main_spec(path_files, tags, components=None):
+    """Update main OpenAPI specification file
+
+    components, when given, replaces the existing components section.
+    """
     base_path = Path(__file__).parent.parent
     main_spec_path = base_path / 'specs' / 'megaport-api.yaml'
     
@@ -251,17 +260,17 @@ def update_main_spec(path_files, tags):
     # Extract base spec without paths (keep everything up to 'paths:')
     parts = content.split('paths:', 1)
     
-    # Build new spec content manually to preserve formatting
-    new_content = parts[0] + 'paths:\n'
-    
-    # Add $ref entries for all path files (using special tag format for file references)
-    for path_file in sorted(path_files):
-        new_content += f"  '{path_file}': !include ./{path_file}\n"
+    # Keep the header as written; reference each path file from its path with plain $ref
+    new_content = parts[0] + spec_yaml.dump(
+        {'paths': {path: {'$ref': f"./{path_file}"} for path, path_file in sorted(path_files.items())}},
+        default_flow_style=False, sort_keys=False)
     
-    # If there's a components section, preserve it
-    if len(parts) > 1 and 'components:' in content:
+    # Write deduplicated components, or preserve an existing components section
+    if components:
+        new_content += spec_yaml.dump({'components': components}, default_flow_style=False, sort_keys=False)
+    elif len(parts) > 1 and 'components:' in content:
         components_part = 'components:' + content.split('components:', 1)[1]
-        new_content += '\n' + components_part
+        new_content += components_part
     else:
         # Add standard components section
         new_content += '''
@@ -292,6 +301,14 @@ components:
     return new_content
 
 def main():
+    parser = argparse.ArgumentParser(description='Generate OpenAPI path specs from the parsed endpoint catalog.')
+    parser.add_argument('--dedup', action='store_true',
+                        help='move repeated responses, parameters and request bodies into components')
+    parser.add_argument('--tag-rules', type=Path, default=RULES_FILE, help='tag rules file')
+    parser.add_argument('--explain-tags', action='store_true', help='print the tag rule that fired for each endpoint')
+    args = parser.parse_args()
+    use_rules_file(args.tag_rules)
+    
     base_path = Path(__file__).parent.parent
     endpoints_file = base_path / 'docs' / 'endpoints_by_section.json'
     
@@ -303,8 +320,14 @@ def main():
     
     print(f"Generating OpenAPI specs for {len(endpoints)} endpoints...\n")
     
+    if args.explain_tags:
+        for endpoint in endpoints:
+            print(f"{endpoint['name']}: {default_classifier().explain(endpoint['name'])}")
+        print()
+    
     # Generate path specs
-    path_files, tags = generate_all_specs(endpoints)
+    components = load_main_components() if args.dedup else None
+    path_files, tags = generate_all_specs(endpoints, components)
     
     print(f"\n{'='*60}")
     print(f"Generated {len(path_files)} path files")
@@ -312,7 +335,7 @@ def main():
     print('='*60)
     
     # Update main spec
-    update_main_spec(path_files, tags)
+    update_main_spec(path_files, tags, components)
     
     print("\n✓ OpenAPI generation complete!")
 
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Generate $ref-free JSON Schema fixtures from specs/components/schemas.
+Every schema is dereferenced ahead of time, stripped of OpenAPI-only
+annotations and written as canonical JSON to
+fixtures/schemas/<tag>/<name>.schema.json, so test workers compile one
+self-contained schema without resolving other files.
+"""
+
+import argparse
+import json
+import re
+from pathlib import Path
+
+from bundle_openapi import RefBundler, RefCycleError, RefResolutionError
+from content_cache import write_if_changed
+from spec_components import fragment_digest
+from split_openapi import clean_tag_name
+import spec_yaml
+
+BASE_PATH = Path(__file__).parent.parent
+SCHEMAS_DIR = BASE_PATH / 'specs' / 'components' / 'schemas'
+PATHS_DIR = BASE_PATH / 'specs' / 'paths'
+OUTPUT_DIR = BASE_PATH / 'fixtures' / 'schemas'
+
+# Schemas used by more than one tag folder, or by none, go here
+COMMON_TAG = 'common'
+
+# $comment of every generated fixture; also how stale ones are recognised
+COMMENT_PREFIX = 'Generated by scripts/generate_schema_fixtures.py from '
+
+# OpenAPI annotations AJV rejects as unknown keywords in strict mode
+OPENAPI_ONLY_KEYWORDS = {'example', 'xml', 'externalDocs', 'discriminator'}
+
+# Keywords holding one schema, a list of schemas, or a map of names to schemas
+SCHEMA_KEYWORDS = {'items', 'additionalProperties', 'not', 'propertyNames', 'contains',
+                   'if', 'then', 'else', 'additionalItems'}
+SCHEMA_LIST_KEYWORDS = {'allOf', 'anyOf', 'oneOf'}
+SCHEMA_MAP_KEYWORDS = {'properties', 'patternProperties', 'definitions', '$defs', 'dependentSchemas'}
+
+SCHEMA_REF_PATTERN = re.compile(r'(?:^|/)([^/#]+)\.ya?ml$|#/components/schemas/([^/]+)$')
+
+
+def kebab_case(name):
+    """Turn 'LocationsResponse' or 'MFAResetRequest' into 'locations-response' or 'mfa-reset-request'."""
+    return re.sub(r'(?<=[a-z0-9])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])', '-', name).lower()
+
+
+def clean_schema(schema):
+    """Copy a dereferenced schema without OpenAPI-only annotations.
+
+    Only schema positions are cleaned, so a property that happens to be
+    called 'example' is kept.
+    """
+    if not isinstance(schema, dict):
+        return schema
+    cleaned = {}
+    for key, value in schema.items():
+        if key in OPENAPI_ONLY_KEYWORDS or key.startswith('x-'):
+            continue
+        if key in SCHEMA_KEYWORDS:
+            cleaned[key] = [clean_schema(item) for item in value] if isinstance(value, list) else clean_schema(value)
+        elif key in SCHEMA_LIST_KEYWORDS and isinstance(value, list):
+            cleaned[key] = [clean_schema(item) for item in value]
+        elif key in SCHEMA_MAP_KEYWORDS and isinstance(value, dict):
+            cleaned[key] = {name: clean_schema(item) for name, item in value.items()}
+        else:
+            cleaned[key] = value
+    return cleaned
+
+
+def iter_refs(node):
+    """Yield every $ref string below node."""
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if isinstance(node.get('$ref'), str):
+                yield node['$ref']
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+
+
+def referenced_schemas(node, names):
+    """The schema names in names that the $refs below node point at."""
+    found = set()
+    for ref in iter_refs(node):
+        match = SCHEMA_REF_PATTERN.search(ref)
+        name = match and (match.group(1) or match.group(2))
+        if name in names:
+            found.add(name)
+    return found
+
+
+def schema_tags(schema_files, paths_dir):
+    """Map each schema name to the tag folders under paths_dir whose operations use it.
+
+    A schema used by another schema counts as used wherever that one is.
+    """
+    names = set(schema_files)
+    tags = {name: set() for name in names}
+    if Path(paths_dir).is_dir():
+        for path_file in sorted(Path(paths_dir).rglob('*.yaml')):
+            tag = path_file.parent.name if path_file.parent != Path(paths_dir) else COMMON_TAG
+            for name in referenced_schemas(spec_yaml.load_spec(path_file), names):
+                tags[name].add(tag)
+    uses = {name: referenced_schemas(spec_yaml.load_spec(path), names) - {name}
+            for name, path in schema_files.items()}
+    changed = True
+    while changed:
+        changed = False
+        for name, used in uses.items():
+            for dependency in used:
+                if not tags[name] <= tags[dependency]:
+                    tags[dependency] |= tags[name]
+                    changed = True
+    return tags
+
+
+def render_fixture(schema, source):
+    """Canonical JSON for a schema: sorted keys and a $comment naming its source and content hash."""
+    digest = fragment_digest(schema)
+    fixture = dict(schema, **{'$comment': f"{COMMENT_PREFIX}{source}; sha256:{digest}"})
+    return json.dumps(fixture, indent=4, sort_keys=True, ensure_ascii=False) + '\n'
+
+
+def generate_fixtures(schemas_dir=SCHEMAS_DIR, paths_dir=PATHS_DIR, output_dir=OUTPUT_DIR):
+    """Write one fixture per schema file and return the written, unchanged, failed and stale files."""
+    schema_files = {path.stem: path for path in sorted(Path(schemas_dir).glob('*.yaml'))}
+    tags = schema_tags(schema_files, paths_dir)
+    bundler = RefBundler(dereference=True)
+    report = {'written': [], 'unchanged': [], 'failed': [], 'stale': []}
+    produced = set()
+    for name, path in schema_files.items():
+        try:
+            source = path.resolve().relative_to(BASE_PATH.resolve()).as_posix()
+        except ValueError:
+            source = path.name
+        try:
+            schema = clean_schema(bundler.dereferenced((str(path.resolve()), ()), ()))
+        except (RefResolutionError, RefCycleError) as exc:
+            report['failed'].append(f"{source}: {exc}")
+            continue
+        tag = clean_tag_name(next(iter(tags[name]))) if len(tags[name]) == 1 else COMMON_TAG
+        output_file = Path(output_dir) / tag / f"{kebab_case(name)}.schema.json"
+        text = render_fixture(schema, source)
+        produced.add(output_file.resolve())
+        report['written' if write_if_changed(output_file, text) else 'unchanged'].append(output_file)
+
+    # Generated fixtures whose schema is gone or moved to another tag
+    for fixture_file in sorted(Path(output_dir).rglob('*.schema.json')):
+        if fixture_file.resolve() in produced:
+            continue
+        try:
+            comment = json.loads(fixture_file.read_text(encoding='utf-8')).get('$comment', '')
+        except (ValueError, AttributeError):
+            continue
+        if isinstance(comment, str) and comment.startswith(COMMENT_PREFIX):
+            report['stale'].append(fixture_file)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate dereferenced JSON Schema fixtures for the API tests.')
+    parser.add_argument('--schemas-dir', type=Path, default=SCHEMAS_DIR, help='directory of OpenAPI schema files')
+    parser.add_argument('--paths-dir', type=Path, default=PATHS_DIR, help='split path specs, used to pick each tag')
+    parser.add_argument('--output-dir', type=Path, default=OUTPUT_DIR, help='fixtures/schemas directory')
+    args = parser.parse_args()
+
+    report = generate_fixtures(args.schemas_dir, args.paths_dir, args.output_dir)
+    for output_file in report['written']:
+        print(f"Generated {output_file}")
+    print(f"{len(report['written'])} fixtures written, {len(report['unchanged'])} unchanged")
+    for failure in report['failed']:
+        print(f"Skipped {failure}")
+    if report['stale']:
+        print(f"{len(report['stale'])} generated fixtures no longer match a schema:")
+        for fixture_file in report['stale']:
+            print(f"  {fixture_file}")
+
+
+if __name__ == '__main__':
+    main()
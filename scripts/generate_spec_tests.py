@@ -1,50 +1,62 @@
+import argparse
+import json
 import os
-import yaml
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+import spec_yaml
+from content_cache import file_digest, text_digest, write_if_changed
+
 # Paths
-WORKSPACE = Path("/home/test/APITestingTask")
+WORKSPACE = Path(__file__).parent.parent
 SPECS_DIR = WORKSPACE / "specs/paths"
 TESTS_DIR = WORKSPACE / "tests/api"
+MANIFEST_FILE = TESTS_DIR / ".generated-manifest.json"
+
+# Bump when the generated test content or the manifest changes, so every test is regenerated
+GENERATOR_VERSION = 4
 
-def generate_test_file(yaml_path, relative_path):
-    with open(yaml_path, 'r') as f:
-        try:
-            data = yaml.safe_load(f)
-        except yaml.YAMLError as exc:
-            print(f"Error reading {yaml_path}: {exc}")
-            return
+LAYOUTS = ('per-path', 'per-tag')
+
+def read_test_case(yaml_path):
+    """Return the endpoint, method and title to test for one path spec, or None."""
+    try:
+        data = spec_yaml.load_spec(yaml_path)
+    except spec_yaml.YAMLError as exc:
+        print(f"Error reading {yaml_path}: {exc}")
+        return None
 
     # Extract info (usually one endpoint per file in this structure based on previous `ls`)
     # Check key structure
     if not isinstance(data, dict):
-        return
+        return None
 
     endpoint = list(data.keys())[0] if data else None
     if not endpoint or not endpoint.startswith('/'):
         # Fallback if structure is different
         # print(f"Skipping {yaml_path}: No valid endpoint found")
-        return
+        return None
 
     methods = data[endpoint]
     if not isinstance(methods, dict): 
-        return
+        return None
 
     # Prefer GET, then POST, etc.
     preferred_methods = ['get', 'post', 'put', 'delete', 'patch']
     method = next((m for m in preferred_methods if m in methods), None)
 
     if not method:
-        return
+        return None
         
     details = methods[method]
     summary = details.get('summary', f"{method.upper()} {endpoint}")
-    
+    return {"endpoint": endpoint, "method": method.upper(), "title": summary}
+
+def render_test_file(case, relative_path):
+    """Return (test path relative to TESTS_DIR, content) of the test for one path spec."""
     # Calculate output path
     # specs/paths/subdir/file.yaml -> tests/api/subdir/file.spec.ts
     output_rel = relative_path.with_suffix('.spec.ts')
-    output_path = TESTS_DIR / output_rel
-    output_path.parent.mkdir(parents=True, exist_ok=True)
     
     # Determine import depth
     # tests/api is the root for relative_path
@@ -66,14 +78,15 @@ def generate_test_file(yaml_path, relative_path):
     # So depth 0 (api root) is ../../
     
     dots = "../" * (depth + 2) # +2 for api/ and tests/
+    title = case['title'].replace('"', '\\"')
 
     # Generate content
     content = f"""import {{ createApiTest }} from "{dots}utils/api-test-factory";
 
 createApiTest({{
-  endpoint: "{endpoint}",
-  method: "{method.upper()}",
-  title: "{summary.replace('"', '\\"')}",
+  endpoint: "{case['endpoint']}",
+  method: "{case['method']}",
+  title: "{title}",
   // schema: require("./path/to/schema"), 
   validParams: {{ 
     // TODO: Add required query params
@@ -83,19 +96,213 @@ createApiTest({{
   }}
 }});
 """
-    
-    with open(output_path, 'w') as f:
-        f.write(content)
-    print(f"Generated {output_path}")
+    return output_rel, content
+
+def render_tag_module(cases):
+    """Return the content of one module testing every (spec name, case) of a tag folder."""
+    rows = []
+    for _, case in cases:
+        rows.append(f"""  {{
+    endpoint: {json.dumps(case['endpoint'], ensure_ascii=False)},
+    method: {json.dumps(case['method'])},
+    title: {json.dumps(case['title'], ensure_ascii=False)},
+    validParams: {{}},
+    validBody: {{}},
+  }},
+""")
+    # Same describe titles as the per-path tests, so report titles survive a layout switch
+    return f"""// Generated by scripts/generate_spec_tests.py --layout per-tag; changes are overwritten
+import {{ test }} from "@playwright/test";
+import {{ createApiTest, type ApiTestOptions }} from "../../utils/api-test-factory";
+
+const endpoints: ApiTestOptions[] = [
+{''.join(rows)}];
+
+for (const options of endpoints) {{
+  test.describe(`Wrapper for ${{options.title}}`, () => {{
+    createApiTest(options);
+  }});
+}}
+"""
+
+def write_test(output_rel, content):
+    """Write a test under TESTS_DIR, leaving it and its mtime alone when the content is the same."""
+    output_path = TESTS_DIR / output_rel
+    written = write_if_changed(output_path, content)
+    if written:
+        print(f"Generated {output_path}")
+    return written
+
+def _read(job):
+    relative_name, digest = job
+    return relative_name, digest, read_test_case(SPECS_DIR / relative_name)
+
+def load_manifest():
+    """Return the manifest of the last run, or an empty one."""
+    try:
+        manifest = json.loads(MANIFEST_FILE.read_text(encoding='utf-8'))
+    except (FileNotFoundError, ValueError):
+        return {}
+    if manifest.get('version') != GENERATOR_VERSION:
+        return {}
+    return manifest
+
+def tag_module(relative_name):
+    """The per-tag module a spec belongs to: specs/paths/pricing/x.yaml -> pricing.generated.spec.ts."""
+    folder = Path(relative_name).parent.as_posix()
+    return f"{folder.replace('/', '-') if folder != '.' else 'untagged'}.generated.spec.ts"
+
+def other_layout_test(relative_name, layout):
+    """The test the other layout writes for a spec, relative to TESTS_DIR."""
+    if layout == 'per-tag':
+        return Path(relative_name).with_suffix('.spec.ts').as_posix()
+    return tag_module(relative_name)
+
+def generate_tests(jobs=1, force=False, layout='per-path'):
+    """Generate tests for new and changed specs and return what happened.
+
+    The manifest maps every spec file's content hash to the endpoint it
+    describes and the test it produced. Specs whose hash is unchanged are not
+    parsed again, and only tests whose specs changed, or that are missing,
+    are rendered. layout 'per-path' writes one test per spec; 'per-tag' one
+    module per tag folder, rewritten when any of its specs changes. Tests the
+    manifest recorded that no spec produces any more are reported as orphans
+    and kept.
+
+    The manifest also records the digest of every test as written. An
+    existing test that does not match it, such as a committed or hand-edited
+    one, is left alone and reported as kept unless force is set.
+
+    A test is not written while the other layout's test for one of its
+    specs exists, manifest or not, since both would run; those are reported
+    as duplicates until the other layout's tests are deleted.
+    """
+    manifest = load_manifest()
+    previous = manifest.get('specs', {})
+    rewrite_all = force or manifest.get('layout') != layout
+    entries = {}
+    pending = []
+    for yaml_file in sorted(SPECS_DIR.rglob("*.yaml")):
+        relative_name = yaml_file.relative_to(SPECS_DIR).as_posix()
+        digest = file_digest(yaml_file)
+        entry = previous.get(relative_name)
+        if entry and not force and entry['digest'] == digest:
+            entries[relative_name] = dict(entry)
+        else:
+            pending.append((relative_name, digest))
+
+    if jobs > 1 and len(pending) > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(pending))) as executor:
+            results = list(executor.map(_read, pending, chunksize=max(1, len(pending) // (jobs * 4))))
+    else:
+        results = [_read(job) for job in pending]
+    for relative_name, digest, case in results:
+        entries[relative_name] = {"digest": digest, "case": case, "test": None}
+
+    changed = {relative_name for relative_name, _ in pending}
+    changed.update(relative_name for relative_name in previous if relative_name not in entries)
+    outputs = {}
+    sources = {}
+    if layout == 'per-tag':
+        groups = {}
+        for relative_name, entry in entries.items():
+            entry['test'] = None
+            if entry['case']:
+                entry['test'] = tag_module(relative_name)
+                groups.setdefault(entry['test'], []).append((relative_name, entry['case']))
+                sources.setdefault(entry['test'], []).append(relative_name)
+        dirty = {tag_module(relative_name) for relative_name in changed}
+        for output_rel, cases in groups.items():
+            if rewrite_all or output_rel in dirty or not (TESTS_DIR / output_rel).exists():
+                outputs[output_rel] = render_tag_module(cases)
+    else:
+        for relative_name, entry in entries.items():
+            if not entry['case']:
+                entry['test'] = None
+                continue
+            output_rel, content = render_test_file(entry['case'], Path(relative_name))
+            entry['test'] = output_rel.as_posix()
+            sources[entry['test']] = [relative_name]
+            if rewrite_all or relative_name in changed or not (TESTS_DIR / output_rel).exists():
+                outputs[entry['test']] = content
+
+    generated = manifest.get('tests', {})
+    tests = {}
+    kept = []
+    duplicates = {}
+    written = 0
+    for output_rel, content in outputs.items():
+        output_path = TESTS_DIR / output_rel
+        others = sorted({other_layout_test(relative_name, layout) for relative_name in sources[output_rel]})
+        others = [other for other in others if (TESTS_DIR / other).exists()]
+        if others:
+            duplicates[output_rel] = others
+            continue
+        if not force and output_path.exists() and file_digest(output_path) not in (
+                generated.get(output_rel), text_digest(content)):
+            kept.append(output_rel)
+            continue
+        written += write_test(output_rel, content)
+        tests[output_rel] = text_digest(content)
+
+    # Orphans stay in the manifest, and in the report, until their test is deleted
+    produced = {entry['test'] for entry in entries.values() if entry['test']}
+    recorded = {entry['test'] for entry in previous.values() if entry.get('test')}
+    recorded.update(manifest.get('orphans', []))
+    orphans = sorted(test for test in recorded - produced if (TESTS_DIR / test).exists())
+    for test in produced:
+        if test not in tests and test in generated:
+            tests[test] = generated[test]
+
+    manifest = {
+        "version": GENERATOR_VERSION,
+        "layout": layout,
+        "specs": dict(sorted(entries.items())),
+        "tests": dict(sorted(tests.items())),
+        "orphans": orphans
+    }
+    write_if_changed(MANIFEST_FILE, json.dumps(manifest, indent=2, ensure_ascii=False) + "\n")
+    return {
+        "checked": len(pending),
+        "written": written,
+        "unchanged": len(produced) - written - len(kept) - len(duplicates),
+        "kept": sorted(kept),
+        "duplicates": dict(sorted(duplicates.items())),
+        "orphans": orphans
+    }
 
 def main():
+    parser = argparse.ArgumentParser(description='Generate Playwright API tests from the split path specs.')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1,
+                        help='generate changed tests on this many processes')
+    parser.add_argument('--force', action='store_true',
+                        help='ignore the manifest and regenerate every test, overwriting edited ones')
+    parser.add_argument('--layout', choices=LAYOUTS, default='per-path',
+                        help='per-path writes one test per spec; per-tag one module per tag folder, '
+                             'e.g. tests/api/pricing.generated.spec.ts')
+    args = parser.parse_args()
+
     if not SPECS_DIR.exists():
         print(f"Specs dir not found: {SPECS_DIR}")
         return
 
-    for yaml_file in SPECS_DIR.rglob("*.yaml"):
-        rel_path = yaml_file.relative_to(SPECS_DIR)
-        generate_test_file(yaml_file, rel_path)
+    report = generate_tests(args.jobs, args.force, args.layout)
+    print(f"{report['checked']} specs new or changed, {report['written']} tests written, "
+          f"{report['unchanged']} unchanged")
+    if report['kept']:
+        print(f"{len(report['kept'])} tests differ from what was last generated and were kept; "
+              "--force overwrites them:")
+        for test in report['kept']:
+            print(f"  {TESTS_DIR / test}")
+    if report['duplicates']:
+        print(f"{len(report['duplicates'])} tests were not written because the other layout's tests "
+              "for their specs exist; delete those to switch layouts:")
+        for test, others in report['duplicates'].items():
+            print(f"  {TESTS_DIR / test} ({len(others)} existing, e.g. {TESTS_DIR / others[0]})")
+    if report['orphans']:
+        print(f"{len(report['orphans'])} generated tests are no longer produced by any spec:")
+        for test in report['orphans']:
+            print(f"  {TESTS_DIR / test}")
 
 if __name__ == "__main__":
     main()
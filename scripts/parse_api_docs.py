@@ -4,8 +4,14 @@ Parse Megaport API documentation HTML file and extract all endpoints.
 """
 
 from html.parser import HTMLParser
+import argparse
+import codecs
+import gzip
 import json
 import re
+import sys
+
+CHUNK_SIZE = 64 * 1024
 
 class PostmanHTMLParser(HTMLParser):
     def __init__(self):
@@ -15,9 +21,21 @@ class PostmanHTMLParser(HTMLParser):
         self.in_request_name = False
         self.in_request_url = False
         self.capture_text = False
-        self.text_buffer = ''
+        # Raw pieces of the current text node, and stripped nodes of the
+        # current element; each is joined once instead of growing a string
+        self.node_parts = []
+        self.text_parts = []
+        
+    def flush_text_node(self):
+        """Strip the finished text node and add it to the element text."""
+        if self.node_parts:
+            text = ''.join(self.node_parts).strip()
+            self.node_parts = []
+            if text:
+                self.text_parts.append(text)
         
     def handle_starttag(self, tag, attrs):
+        self.flush_text_node()
         attrs_dict = dict(attrs)
         if 'class' in attrs_dict:
             classes = attrs_dict['class'].split()
@@ -29,18 +47,23 @@ class PostmanHTMLParser(HTMLParser):
                 self.capture_text = True
                 
     def handle_data(self, data):
+        # A text node can arrive in several calls when fed in chunks
         if self.capture_text:
-            self.text_buffer += data.strip()
+            self.node_parts.append(data)
+            
+    def handle_comment(self, data):
+        self.flush_text_node()
             
     def handle_endtag(self, tag):
-        if self.in_request_name and self.text_buffer:
-            self.current_endpoint['name'] = self.text_buffer
-            self.text_buffer = ''
+        self.flush_text_node()
+        if self.in_request_name and self.text_parts:
+            self.current_endpoint['name'] = ''.join(self.text_parts)
+            self.text_parts = []
             self.in_request_name = False
             self.capture_text = False
-        elif self.in_request_url and self.text_buffer:
+        elif self.in_request_url and self.text_parts:
             # Extract method and URL
-            parts = self.text_buffer.split()
+            parts = ''.join(self.text_parts).split()
             if len(parts) >= 2:
                 self.current_endpoint['method'] = parts[0]
                 url = ' '.join(parts[1:])
@@ -51,24 +74,71 @@ class PostmanHTMLParser(HTMLParser):
                 if 'name' in self.current_endpoint and 'method' in self.current_endpoint:
                     self.endpoints.append(self.current_endpoint.copy())
                     self.current_endpoint = {}
-            self.text_buffer = ''
+            self.text_parts = []
             self.in_request_url = False
             self.capture_text = False
 
-def main():
-    parser = PostmanHTMLParser()
-    with open('docs/api_docs.html', 'r', encoding='utf-8') as f:
-        parser.feed(f.read())
+    def iter_endpoints(self, stream, chunk_size=CHUNK_SIZE):
+        """Feed a text or binary file-like object in fixed-size chunks and yield endpoints as they complete.
+
+        Completed endpoints are handed out after every chunk, so memory stays
+        bounded by the chunk size rather than the input size.
+        """
+        decoder = None
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            if isinstance(chunk, bytes):
+                if decoder is None:
+                    decoder = codecs.getincrementaldecoder('utf-8')()
+                chunk = decoder.decode(chunk)
+            self.feed(chunk)
+            yield from self.endpoints
+            self.endpoints.clear()
+        if decoder is not None:
+            self.feed(decoder.decode(b'', final=True))
+        self.close()
+        yield from self.endpoints
+        self.endpoints.clear()
+
+def open_docs(path):
+    """Open a documentation file for streaming; '-' is stdin and *.gz is read through gzip."""
+    if path == '-':
+        return sys.stdin
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
 
-    # Print unique endpoints
+def unique(endpoints):
+    """Keep the first endpoint for each method and URL."""
     seen = set()
     unique_endpoints = []
-    for ep in parser.endpoints:
+    for ep in endpoints:
         key = f"{ep['method']} {ep['url']}"
         if key not in seen:
             seen.add(key)
             unique_endpoints.append(ep)
-            
+    return unique_endpoints
+
+def main():
+    parser = argparse.ArgumentParser(description='Extract endpoints from the Postman API documentation HTML.')
+    parser.add_argument('html_file', nargs='?', default='docs/api_docs.html',
+                        help="documentation HTML; '-' reads stdin and *.gz is decompressed")
+    parser.add_argument('--stream', action='store_true',
+                        help='parse in fixed-size chunks with bounded memory (implied for stdin and gzip)')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='characters read per chunk when streaming')
+    args = parser.parse_args()
+
+    if args.stream or args.html_file == '-' or args.html_file.endswith('.gz'):
+        with open_docs(args.html_file) as stream:
+            unique_endpoints = unique(PostmanHTMLParser().iter_endpoints(stream, args.chunk_size))
+    else:
+        html_parser = PostmanHTMLParser()
+        with open(args.html_file, 'r', encoding='utf-8') as f:
+            html_parser.feed(f.read())
+        unique_endpoints = unique(html_parser.endpoints)
+
     # Print summary
     print(f"Total unique endpoints found: {len(unique_endpoints)}\n")
     
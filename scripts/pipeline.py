@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+Run the spec toolchain as a DAG of stages with declared inputs and outputs.
+A stage runs only when the hashes of its inputs, its command or its
+outputs differ from the last successful run; stages whose dependencies have
+finished run in parallel. Edges follow from the declarations: a stage
+depends on every stage writing files its inputs match. A stage with no
+recorded run whose outputs all exist, as on a fresh checkout, adopts them
+instead of regenerating committed files; --force runs it anyway. Stages
+downstream of one that failed or is missing inputs are blocked.
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from fnmatch import fnmatch
+from pathlib import Path
+
+from content_cache import DEFAULT_CACHE_DIR, atomic_write, file_digest
+
+BASE_PATH = Path(__file__).parent.parent
+SCRIPTS_DIR = Path(__file__).parent
+STATE_FILE = DEFAULT_CACHE_DIR / 'pipeline' / 'state.json'
+STATE_VERSION = 1
+DEFAULT_JOBS = max(2, os.cpu_count() or 1)
+
+
+class PipelineError(ValueError):
+    """The stage declarations do not form a DAG, or name unknown stages."""
+
+
+class Stage:
+    """One script run with fixed arguments.
+
+    inputs and outputs are glob patterns relative to the repository root.
+    The script and the local modules it imports count as inputs too, so
+    editing the code reruns the stage. Every input pattern has to match a
+    file for the stage to run.
+    """
+
+    def __init__(self, name, script, inputs, outputs, args=()):
+        self.name = name
+        self.script = script
+        self.args = list(args)
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+
+    @property
+    def command(self):
+        return [sys.executable, str(SCRIPTS_DIR / self.script)] + self.args
+
+    def code_files(self):
+        return [f"scripts/{name}" for name in sorted(local_modules(self.script))]
+
+
+STAGES = [
+    Stage('section_parser', 'section_parser.py',
+          inputs=['docs/api_docs.html'],
+          outputs=['docs/endpoints_by_section.json']),
+    Stage('generate_openapi', 'generate_openapi.py',
+          inputs=['docs/endpoints_by_section.json', 'scripts/tag_rules.yaml', 'specs/megaport-api.yaml'],
+          outputs=['specs/doc-paths/*.yaml', 'specs/megaport-api.yaml']),
+    Stage('postman_to_openapi', 'postman_to_openapi.py',
+          inputs=['megaport_collection.json'],
+          outputs=['specs/megaport-api-converted.yaml']),
+    Stage('split_openapi', 'split_openapi.py',
+          inputs=['specs/megaport-api-converted.yaml'],
+          outputs=['specs/openapi.yaml', 'specs/paths/*/*.yaml']),
+    Stage('generate_spec_tests', 'generate_spec_tests.py',
+          inputs=['specs/paths/*/*.yaml'],
+          outputs=['tests/api/.generated-manifest.json']),
+    Stage('generate_schema_fixtures', 'generate_schema_fixtures.py',
+          inputs=['specs/components/schemas/*.yaml', 'specs/paths/*/*.yaml'],
+          outputs=['fixtures/schemas/**/*.schema.json']),
+]
+
+_modules = {}
+
+
+def local_modules(script):
+    """script and the modules under scripts/ it imports, directly or not."""
+    if script not in _modules:
+        found = set()
+        pending = [script]
+        while pending:
+            name = pending.pop()
+            if name in found:
+                continue
+            found.add(name)
+            tree = ast.parse((SCRIPTS_DIR / name).read_text(encoding='utf-8'))
+            for node in ast.walk(tree):
+                if isinstance(node, ast.Import):
+                    imported = [alias.name for alias in node.names]
+                elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                    imported = [node.module]
+                else:
+                    continue
+                pending += [f"{module}.py" for module in imported if (SCRIPTS_DIR / f"{module}.py").is_file()]
+        _modules[script] = found
+    return _modules[script]
+
+
+def patterns_overlap(output, pattern):
+    """Whether a file written under output could match input pattern (and so the reverse)."""
+    return fnmatch(output, pattern) or fnmatch(pattern, output)
+
+
+def dependencies(stages):
+    """Map each stage name to the names of the stages writing files it reads."""
+    graph = {}
+    for stage in stages:
+        graph[stage.name] = [other.name for other in stages if other is not stage and any(
+            patterns_overlap(output, pattern) for output in other.outputs for pattern in stage.inputs)]
+    # Reject cycles up front rather than deadlock the scheduler
+    done, visiting = set(), []
+
+    def visit(name):
+        if name in visiting:
+            raise PipelineError("Stage cycle: " + ' -> '.join(visiting[visiting.index(name):] + [name]))
+        if name not in done:
+            visiting.append(name)
+            for dependency in graph[name]:
+                visit(dependency)
+            visiting.pop()
+            done.add(name)
+
+    for name in graph:
+        visit(name)
+    return graph
+
+
+def select_stages(stages, graph, names):
+    """The named stages and everything upstream of them, in declaration order."""
+    known = {stage.name for stage in stages}
+    unknown = [name for name in names if name not in known]
+    if unknown:
+        raise PipelineError(f"Unknown stages: {', '.join(unknown)} (choose from {', '.join(sorted(known))})")
+    wanted, pending = set(), list(names)
+    while pending:
+        name = pending.pop()
+        if name not in wanted:
+            wanted.add(name)
+            pending += graph[name]
+    return [stage for stage in stages if stage.name in wanted]
+
+
+class Pipeline:
+    """Schedules stages and remembers the hashes of their last successful run.
+
+    The state file maps every hashed file to (size, mtime_ns, digest), so
+    unchanged files are not read again, and every stage to the fingerprint
+    of its inputs and the digests of its outputs.
+    """
+
+    def __init__(self, stages, state_file=STATE_FILE, force=False, verbose=False):
+        self.stages = stages
+        self.graph = dependencies(stages)
+        self.state_file = Path(state_file)
+        self.force = force
+        self.verbose = verbose
+        self.lock = threading.Lock()
+        state = self.load_state()
+        self.files = state['files']
+        self.records = state['stages']
+        # Files hashed this run; only these are kept in the state file
+        self.seen = set()
+        self.results = {}
+
+    def load_state(self):
+        try:
+            state = json.loads(self.state_file.read_text(encoding='utf-8'))
+        except (FileNotFoundError, ValueError):
+            state = None
+        if not isinstance(state, dict) or state.get('version') != STATE_VERSION:
+            return {'files': {}, 'stages': {}}
+        return state
+
+    def save_state(self):
+        with self.lock:
+            files = {file: entry for file, entry in self.files.items() if file in self.seen}
+            state = {'version': STATE_VERSION, 'files': files, 'stages': self.records}
+            atomic_write(self.state_file, json.dumps(state, indent=1, sort_keys=True) + '\n')
+
+    def digest(self, relative):
+        """File digest, reusing the stored one while size and mtime are unchanged."""
+        stat = (BASE_PATH / relative).stat()
+        self.seen.add(relative)
+        known = self.files.get(relative)
+        if known and known[0] == stat.st_size and known[1] == stat.st_mtime_ns:
+            return known[2]
+        digest = file_digest(BASE_PATH / relative)
+        with self.lock:
+            self.files[relative] = [stat.st_size, stat.st_mtime_ns, digest]
+        return digest
+
+    def expand(self, patterns):
+        """Relative paths of the files matching each pattern, or None for a pattern matching nothing."""
+        matches = {}
+        for pattern in patterns:
+            files = sorted(path.relative_to(BASE_PATH).as_posix()
+                           for path in BASE_PATH.glob(pattern) if path.is_file())
+            matches[pattern] = files or None
+        return matches
+
+    def input_fingerprint(self, stage):
+        """Hash of the stage's command and input files, or None when an input pattern matches nothing."""
+        matches = self.expand(stage.inputs)
+        if None in matches.values():
+            return None
+        files = sorted({file for found in matches.values() for file in found} | set(stage.code_files()))
+        hasher = hashlib.sha256(json.dumps([stage.script] + stage.args).encode('utf-8'))
+        for file in files:
+            hasher.update(f"{file}\0{self.digest(file)}\n".encode('utf-8'))
+        return hasher.hexdigest()
+
+    def output_digests(self, stage):
+        matches = self.expand(stage.outputs)
+        return {file: self.digest(file) for found in matches.values() if found for file in found}
+
+    def missing_inputs(self, stage):
+        return [pattern for pattern, found in self.expand(stage.inputs).items() if found is None]
+
+    def adoptable(self, stage, upstream_changed):
+        """Whether a stage never run here already has all its outputs, and nothing upstream just changed."""
+        return (not self.force and not upstream_changed and stage.name not in self.records
+                and None not in self.expand(stage.outputs).values())
+
+    def record(self, stage):
+        # Hash inputs again: a stage may rewrite one of its own inputs
+        record = {'inputs': self.input_fingerprint(stage), 'outputs': self.output_digests(stage)}
+        with self.lock:
+            self.records[stage.name] = record
+
+    def is_fresh(self, stage, fingerprint):
+        record = self.records.get(stage.name)
+        return (not self.force and record is not None and record['inputs'] == fingerprint
+                and record['outputs'] == self.output_digests(stage))
+
+    def run_stage(self, stage, upstream_changed=False):
+        """Run stage unless it is fresh or adoptable; returns a result dict with status, seconds and output."""
+        started = time.perf_counter()
+        fingerprint = self.input_fingerprint(stage)
+        if fingerprint is None:
+            return {'status': 'missing', 'seconds': time.perf_counter() - started,
+                    'output': f"No files match {', '.join(self.missing_inputs(stage))}\n"}
+        if self.is_fresh(stage, fingerprint):
+            return {'status': 'skipped', 'seconds': time.perf_counter() - started, 'output': ''}
+        if self.adoptable(stage, upstream_changed):
+            self.record(stage)
+            return {'status': 'adopted', 'seconds': time.perf_counter() - started,
+                    'output': "Existing outputs recorded as up to date; --force regenerates them\n"}
+
+        process = subprocess.run(stage.command, cwd=BASE_PATH, stdout=subprocess.PIPE,
+                                 stderr=subprocess.STDOUT, text=True)
+        if process.returncode != 0:
+            return {'status': 'failed', 'seconds': time.perf_counter() - started, 'output': process.stdout}
+        self.record(stage)
+        return {'status': 'ran', 'seconds': time.perf_counter() - started, 'output': process.stdout}
+
+    def report(self, stage, result):
+        print(f"[{result['status']:>7}] {stage.name} ({result['seconds']:.2f}s)")
+        if result['output'] and (self.verbose or result['status'] in ('failed', 'missing')):
+            for line in result['output'].rstrip('\n').splitlines():
+                print(f"    {line}")
+        sys.stdout.flush()
+
+    def run(self, jobs=DEFAULT_JOBS):
+        """Run every stage once its dependencies are done.
+
+        A stage that failed or is missing inputs blocks everything depending
+        on it, so downstream outputs are never adopted or rebuilt from stale
+        upstream ones.
+        """
+        by_name = {stage.name: stage for stage in self.stages}
+        waiting = dict(self.graph)
+        running = {}
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+            while waiting or running:
+                for name in [name for name in waiting if all(dep in self.results for dep in waiting[name])]:
+                    after = waiting.pop(name)
+                    if any(self.results[dep]['status'] in ('failed', 'missing', 'blocked') for dep in after):
+                        self.results[name] = {'status': 'blocked', 'seconds': 0.0, 'output': ''}
+                        self.report(by_name[name], self.results[name])
+                    else:
+                        upstream_changed = any(self.results[dep]['status'] == 'ran' for dep in after)
+                        running[executor.submit(self.run_stage, by_name[name], upstream_changed)] = name
+                if not running:
+                    continue
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    self.results[name] = future.result()
+                    self.report(by_name[name], self.results[name])
+        self.save_state()
+        return self.results
+
+    def plan(self):
+        """What run() would do, without running anything.
+
+        Each stage is fresh, stale, missing inputs, blocked (downstream of a
+        stage missing inputs), adopt (never run here, but its outputs exist),
+        or pending: fresh now but downstream of a stale stage, so it runs
+        only if that one changes its outputs.
+        """
+        plan = {}
+        for stage in self.stages:
+            fingerprint = self.input_fingerprint(stage)
+            upstream_stale = any(plan[dep] in ('stale', 'pending') for dep in self.graph[stage.name])
+            if any(plan[dep] in ('missing', 'blocked') for dep in self.graph[stage.name]):
+                plan[stage.name] = 'blocked'
+            elif fingerprint is None:
+                plan[stage.name] = 'missing'
+            elif not self.is_fresh(stage, fingerprint):
+                plan[stage.name] = 'adopt' if self.adoptable(stage, upstream_stale) else 'stale'
+            elif upstream_stale:
+                plan[stage.name] = 'pending'
+            else:
+                plan[stage.name] = 'fresh'
+        return plan
+
+
+def ordered(stages, graph):
+    """stages sorted so every stage comes after its dependencies."""
+    result, seen = [], set()
+
+    def visit(name):
+        if name not in seen:
+            seen.add(name)
+            for dependency in graph[name]:
+                visit(dependency)
+            result.append(name)
+
+    for stage in stages:
+        visit(stage.name)
+    by_name = {stage.name: stage for stage in stages}
+    return [by_name[name] for name in result]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the spec toolchain, skipping stages whose inputs did not change.')
+    parser.add_argument('stages', nargs='*', help='stages to bring up to date, with their dependencies; all by default')
+    parser.add_argument('--force', action='store_true', help='run the selected stages even if they are up to date')
+    parser.add_argument('--jobs', type=int, default=DEFAULT_JOBS, help='stages run at the same time')
+    parser.add_argument('--list', action='store_true', help='show the stages, their inputs, outputs and dependencies')
+    parser.add_argument('--dry-run', action='store_true', help='show which stages would run')
+    parser.add_argument('-v', '--verbose', action='store_true', help='print the output of every stage that ran')
+    parser.add_argument('--state-file', type=Path, default=STATE_FILE, help='hashes of the last successful runs')
+    args = parser.parse_args()
+
+    try:
+        stages = select_stages(STAGES, dependencies(STAGES), args.stages) if args.stages else STAGES
+        pipeline = Pipeline(ordered(stages, dependencies(stages)), args.state_file, args.force, args.verbose)
+    except PipelineError as exc:
+        print(f"Error: {exc}")
+        sys.exit(1)
+
+    if args.list:
+        for stage in pipeline.stages:
+            print(stage.name)
+            print(f"  command: {' '.join([stage.script] + stage.args)}")
+            print(f"  inputs:  {', '.join(stage.inputs + stage.code_files())}")
+            print(f"  outputs: {', '.join(stage.outputs)}")
+            if pipeline.graph[stage.name]:
+                print(f"  after:   {', '.join(pipeline.graph[stage.name])}")
+        return
+    if args.dry_run:
+        for name, status in pipeline.plan().items():
+            print(f"[{status:>7}] {name}")
+        return
+
+    started = time.perf_counter()
+    results = pipeline.run(args.jobs)
+    counts = {}
+    for result in results.values():
+        counts[result['status']] = counts.get(result['status'], 0) + 1
+    print(f"Pipeline finished in {time.perf_counter() - started:.2f}s: "
+          + ', '.join(f"{count} {status}" for status, count in sorted(counts.items())))
+    if counts.get('failed'):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,18 +4,76 @@ Convert Postman Collection v2 to OpenAPI 3.0 specifications.
 Preserves folder structure and all details.
 """
 
+import argparse
 import json
 import os
 import re
-import yaml
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Callable, Iterable, Optional
+
+import collection_stream
+import spec_yaml
+from collection_fingerprints import FingerprintStore, converter_version
+from collection_stream import iter_collection, iter_item_events
+from content_cache import file_digest, write_if_changed
+from spec_components import deduplicate_components
+
+
+HTML_TAG_PATTERN = re.compile(r'<[^>]+>')
+BLANK_LINES_PATTERN = re.compile(r'\n\n+')
+DESCRIPTION_CACHE_SIZE = 4096
+
+
+class DescriptionCleaner:
+    """Strips HTML from descriptions, remembering recent results.
+
+    Collections repeat the same long descriptions across many requests, so
+    each distinct text is cleaned once while it stays among the maxsize most
+    recently used.
+    """
+
+    def __init__(self, maxsize: int = DESCRIPTION_CACHE_SIZE):
+        self.clean = lru_cache(maxsize=maxsize)(self._clean)
+        self.strip_tags = lru_cache(maxsize=maxsize)(self._strip_tags)
+
+    @staticmethod
+    def _clean(description: str) -> str:
+        """Remove HTML tags, collapse runs of blank lines and trim."""
+        description = HTML_TAG_PATTERN.sub('', description)
+        return BLANK_LINES_PATTERN.sub('\n\n', description).strip()
+
+    @staticmethod
+    def _strip_tags(description: str) -> str:
+        """Remove HTML tags only, as tag descriptions always have."""
+        return HTML_TAG_PATTERN.sub('', description)
+
+    def stats(self) -> tuple:
+        """Return (hits, misses) over both caches."""
+        clean, strip_tags = self.clean.cache_info(), self.strip_tags.cache_info()
+        return clean.hits + strip_tags.hits, clean.misses + strip_tags.misses
+
+
+def folder_rank(folder: Optional[tuple]) -> tuple:
+    """Sort key for a (parent, sibling index) folder chain; lower ranks win a tag description.
+
+    A folder directly on a level beats deeper ones, a later one beats an
+    earlier one there, and below that level the earlier subtree wins.
+    """
+    indices = []
+    while folder is not None:
+        folder, index = folder
+        indices.append(index)
+    indices.reverse()
+    return tuple((1, index) for index in indices[:-1]) + ((0, -indices[-1]),)
 
 
 class PostmanToOpenAPI:
     def __init__(self, postman_collection_path: str, output_dir: str):
         self.postman_collection_path = postman_collection_path
         self.output_dir = output_dir
+        self.descriptions = DescriptionCleaner()
         self.base_openapi = {
             "openapi": "3.0.0",
             "info": {},
@@ -38,10 +96,7 @@ class PostmanToOpenAPI:
         info = collection.get('info', {})
         
         # Clean HTML from description
-        description = info.get('description', '')
-        # Remove HTML tags for cleaner description
-        description = re.sub(r'<[^>]+>', '', description)
-        description = re.sub(r'\n\n+', '\n\n', description).strip()
+        description = self.descriptions.clean(info.get('description', ''))
         
         return {
             "title": info.get('name', 'Megaport API'),
@@ -129,9 +184,7 @@ class PostmanToOpenAPI:
             path = '/' + path
         
         # Clean description
-        description = item.get('description', item.get('name', ''))
-        description = re.sub(r'<[^>]+>', '', description)
-        description = re.sub(r'\n\n+', '\n\n', description).strip()
+        description = self.descriptions.clean(item.get('description', item.get('name', '')))
         
         # Build operation object
         operation = {
@@ -238,31 +291,64 @@ class PostmanToOpenAPI:
         clean_path = re.sub(r'_+', '_', clean_path).strip('_')
         return f"{method}_{clean_path}"
     
-    def process_items(self, items: List[Dict], tag: str = "") -> Dict:
-        """Process Postman items recursively to build paths."""
+    def walk_items(self, events: Iterable[tuple], tag: str = "",
+                   convert_request: Optional[Callable] = None) -> tuple:
+        """Build paths and tags in one pass over (kind, item, parent) collection events.
+
+        Returns (collection, paths, tags). collection holds the info from an
+        'info' event, if any. Requests outside any folder get tag. Requests
+        are turned into operations by convert_request (item, tag), which
+        defaults to convert_request_to_operation.
+
+        Operations go straight into the final paths dict in document order,
+        with later duplicates of a path and method replacing earlier ones. A
+        tag keeps the position of the first folder with its name. Its
+        description comes from the last folder of that name on the shallowest
+        level holding one, or else from the first subtree holding one.
+        """
+        convert_request = convert_request or self.convert_request_to_operation
+        collection = {}
         paths = {}
-        
-        for item in items:
-            # Check if it's a folder with sub-items
-            if 'item' in item and isinstance(item['item'], list):
-                # It's a folder - use its name as tag
-                folder_name = item.get('name', 'default')
-                sub_paths = self.process_items(item['item'], folder_name)
-                # Merge sub_paths into paths
-                for path, methods in sub_paths.items():
-                    if path not in paths:
-                        paths[path] = {}
-                    paths[path].update(methods)
-            elif 'request' in item:
-                # It's a request
-                result = self.convert_request_to_operation(item, tag or "default")
+        tags = {}
+        tag_folders = {}
+        # Open folders as (parent, sibling index) chains, and folders seen so
+        # far on each open level
+        open_folders = []
+        siblings = [0]
+        
+        for kind, item, parent in events:
+            if kind == 'request':
+                folder_name = parent.get('name', 'default') if parent is not None else tag
+                result = convert_request(item, folder_name or "default")
                 if result:
                     path, method, operation = result
                     if path not in paths:
                         paths[path] = {}
                     paths[path][method] = operation
+            elif kind == 'folder':
+                open_folders.append((open_folders[-1] if open_folders else None, siblings[-1]))
+                siblings[-1] += 1
+                siblings.append(0)
+                tags.setdefault(item.get('name', ''), None)
+            elif kind == 'end':
+                siblings.pop()
+                folder = open_folders.pop()
+                folder_name = item.get('name', '')
+                # Ranks are only built for repeated names, keeping the walk linear
+                if folder_name not in tag_folders or folder_rank(folder) < folder_rank(tag_folders[folder_name]):
+                    tag_folders[folder_name] = folder
+                    tags[folder_name] = {
+                        "name": folder_name,
+                        "description": self.descriptions.strip_tags(item.get('description', ''))
+                    }
+            elif kind == 'info':
+                collection['info'] = item
         
-        return paths
+        return collection, paths, list(tags.values())
+    
+    def process_items(self, items: List[Dict], tag: str = "") -> Dict:
+        """Build the paths for an item tree (see walk_items)."""
+        return self.walk_items(iter_item_events(items), tag)[1]
     
     def extract_security_schemes(self, collection: Dict) -> Dict:
         """Extract security schemes from collection."""
@@ -285,48 +371,58 @@ class PostmanToOpenAPI:
         return schemes
     
     def extract_tags(self, items: List[Dict], parent_tag: str = "") -> List[Dict]:
-        """Extract unique tags from collection structure."""
-        tags = {}
-        
-        for item in items:
-            if 'item' in item and isinstance(item['item'], list):
-                # It's a folder
-                folder_name = item.get('name', '')
-                description = item.get('description', '')
-                description = re.sub(r'<[^>]+>', '', description)
-                
-                tags[folder_name] = {
-                    "name": folder_name,
-                    "description": description
-                }
-                # Recursively process sub-items
-                sub_tags = self.extract_tags(item['item'], folder_name)
-                for tag in sub_tags:
-                    if tag['name'] not in tags:
-                        tags[tag['name']] = tag
-        
-        return list(tags.values())
+        """Extract unique tags from collection structure (see walk_items)."""
+        return self.walk_items(iter_item_events(items))[2]
     
-    def convert(self) -> Dict[str, Any]:
-        """Main conversion method."""
-        print(f"Loading Postman collection from {self.postman_collection_path}")
-        collection = self.load_postman_collection()
+    def build_from_events(self, events: Iterable[tuple], collection: Optional[Dict] = None,
+                          convert_request: Optional[Callable] = None) -> Dict[str, Any]:
+        """Build the OpenAPI spec from collection events, walking the items once.
+
+        collection supplies the info when the events carry none.
+        """
+        walked, paths, tags = self.walk_items(events, convert_request=convert_request)
+        if collection is None:
+            collection = walked
         
-        print("Extracting information...")
         openapi_spec = self.base_openapi.copy()
         openapi_spec['info'] = self.extract_info(collection)
         openapi_spec['servers'] = self.extract_servers(collection)
+        openapi_spec['paths'] = paths
+        openapi_spec['components']['securitySchemes'] = self.extract_security_schemes(collection)
+        openapi_spec['tags'] = tags
+        return openapi_spec
+    
+    def report_description_cache(self):
+        """Print the description cache's hit and miss counts."""
+        hits, misses = self.descriptions.stats()
+        print(f"Description cache: {hits} hits, {misses} misses")
+    
+    def convert_stream(self, convert_request: Optional[Callable] = None) -> Dict[str, Any]:
+        """Conversion that reads the collection incrementally instead of loading it whole."""
+        print(f"Streaming Postman collection from {self.postman_collection_path}")
+        with open(self.postman_collection_path, 'r', encoding='utf-8') as f:
+            openapi_spec = self.build_from_events(iter_collection(f), convert_request=convert_request)
         
-        print("Processing items and building paths...")
-        openapi_spec['paths'] = self.process_items(collection.get('item', []))
+        print(f"Conversion complete. Found {len(openapi_spec['paths'])} paths with {len(openapi_spec['tags'])} tags")
+        self.report_description_cache()
         
-        print("Extracting security schemes...")
-        openapi_spec['components']['securitySchemes'] = self.extract_security_schemes(collection)
+        return openapi_spec
+    
+    def convert(self, convert_request: Optional[Callable] = None) -> Dict[str, Any]:
+        """Main conversion method.
+
+        convert_request replaces convert_request_to_operation, e.g. to reuse
+        unchanged operations (see collection_fingerprints).
+        """
+        print(f"Loading Postman collection from {self.postman_collection_path}")
+        collection = self.load_postman_collection()
         
-        print("Extracting tags...")
-        openapi_spec['tags'] = self.extract_tags(collection.get('item', []))
+        print("Processing items, tags and security in one pass...")
+        openapi_spec = self.build_from_events(iter_item_events(collection.get('item', [])), collection,
+                                              convert_request)
         
         print(f"Conversion complete. Found {len(openapi_spec['paths'])} paths with {len(openapi_spec['tags'])} tags")
+        self.report_description_cache()
         
         return openapi_spec
     
@@ -338,24 +434,218 @@ class PostmanToOpenAPI:
         os.makedirs(self.output_dir, exist_ok=True)
         
         print(f"Saving OpenAPI spec to {output_path}")
-        with open(output_path, 'w', encoding='utf-8') as f:
-            yaml.dump(spec, f, default_flow_style=False, sort_keys=False, allow_unicode=True)
+        text = spec_yaml.dump(spec, default_flow_style=False, sort_keys=False, allow_unicode=True)
         
-        print(f"Successfully saved to {output_path}")
+        # Leave the file alone when nothing changed, so downstream steps can skip it
+        if write_if_changed(output_path, text):
+            print(f"Successfully saved to {output_path}")
+        else:
+            print(f"Unchanged: {output_path}")
         return output_path
 
 
+def _convert_collection(collection_path: str, output_dir: str, stream: bool) -> Dict[str, Any]:
+    """Process pool worker: convert one collection."""
+    converter = PostmanToOpenAPI(collection_path, output_dir)
+    return converter.convert_stream() if stream else converter.convert()
+
+
+def convert_collections(collection_paths: List[str], output_dir: str, jobs: int = 1,
+                        stream: bool = False) -> List[Dict[str, Any]]:
+    """Convert several collections, on a process pool when jobs > 1.
+
+    Specs come back in the order of collection_paths whatever order the
+    workers finish in.
+    """
+    if jobs <= 1 or len(collection_paths) < 2:
+        return [_convert_collection(path, output_dir, stream) for path in collection_paths]
+    count = len(collection_paths)
+    with ProcessPoolExecutor(max_workers=min(jobs, count)) as executor:
+        return list(executor.map(_convert_collection, collection_paths, [output_dir] * count, [stream] * count))
+
+
+def merge_specs(specs: List[Dict[str, Any]], sources: List[str]) -> tuple:
+    """Merge converted specs into one, returning (spec, conflicts).
+
+    The first spec supplies info, servers and security schemes. Paths,
+    operations and tags are taken in spec order and the first occurrence
+    wins, so the result depends only on the order of specs. Each conflict
+    records a path and method defined twice or an operationId used by two
+    operations, with the sources involved.
+    """
+    merged = dict(specs[0])
+    merged['paths'] = {}
+    merged['components'] = {section: dict(values) for section, values in specs[0]['components'].items()}
+    tags = {}
+    owners = {}
+    operation_ids = {}
+    conflicts = []
+    
+    for spec, source in zip(specs, sources):
+        for section, values in spec.get('components', {}).items():
+            for name, value in values.items():
+                merged['components'].setdefault(section, {}).setdefault(name, value)
+        for tag in spec.get('tags', []):
+            tags.setdefault(tag['name'], tag)
+        for path, methods in spec['paths'].items():
+            merged_methods = merged['paths'].setdefault(path, {})
+            for method, operation in methods.items():
+                if method in merged_methods:
+                    conflicts.append({
+                        "kind": "path",
+                        "path": path,
+                        "method": method,
+                        "kept": owners[path, method],
+                        "dropped": source
+                    })
+                    continue
+                operation_id = operation.get('operationId')
+                if operation_id in operation_ids:
+                    kept_path, kept_method, kept_source = operation_ids[operation_id]
+                    conflicts.append({
+                        "kind": "operationId",
+                        "operationId": operation_id,
+                        "path": path,
+                        "method": method,
+                        "source": source,
+                        "clashes_with": f"{kept_method.upper()} {kept_path} ({kept_source})"
+                    })
+                elif operation_id:
+                    operation_ids[operation_id] = (path, method, source)
+                merged_methods[method] = operation
+                owners[path, method] = source
+    
+    merged['tags'] = list(tags.values())
+    return merged, conflicts
+
+
+def report_conflicts(conflicts: List[Dict]) -> None:
+    """Print merge conflicts, one per line."""
+    print(f"{len(conflicts)} merge conflicts")
+    for conflict in conflicts:
+        if conflict['kind'] == 'path':
+            print(f"  {conflict['method'].upper()} {conflict['path']}: defined in {conflict['kept']} "
+                  f"and {conflict['dropped']}; keeping {conflict['kept']}")
+        else:
+            print(f"  operationId {conflict['operationId']} of {conflict['method'].upper()} {conflict['path']} "
+                  f"({conflict['source']}) is already used by {conflict['clashes_with']}")
+
+
+CHANGES_LISTED = 20
+
+def convert_incremental(collection_paths: List[str], output_dir: str, filename: str,
+                        stream: bool = False, dedup: bool = False, patch: bool = True) -> tuple:
+    """Convert collections reusing what is unchanged since the last run.
+
+    Fingerprints are kept next to the output as <name>.fingerprints.json,
+    under a version that changes with the converter's source. Collections
+    whose file is unchanged are not read, and the previous spec is patched
+    at the paths and methods whose items were added, changed or removed.
+    When the previous spec cannot be patched (first run, edited output,
+    --dedup, or an operation only a skipped collection could supply) the
+    collections are converted and merged as in a full run, still reusing
+    unchanged operations. Returns (spec, conflicts, store); conflicts are
+    only found by a merge.
+    """
+    output_path = Path(output_dir) / filename
+    fingerprints_path = output_path.with_suffix('.fingerprints.json')
+    previous_spec = spec_yaml.load_spec(output_path) if output_path.exists() else None
+    previous = json.loads(fingerprints_path.read_text(encoding='utf-8')) if fingerprints_path.exists() else None
+    store = FingerprintStore(previous_spec, previous, converter_version(__file__, collection_stream.__file__))
+    patch = patch and store.can_patch(file_digest(output_path) if previous_spec is not None else None, dedup)
+    
+    specs, frames = [], []
+    for collection_path in collection_paths:
+        digest = file_digest(collection_path)
+        if patch and store.collection_unchanged(collection_path, digest):
+            print(f"Unchanged: {collection_path}")
+            frames.append(store.carry_over(collection_path))
+            continue
+        converter = PostmanToOpenAPI(collection_path, output_dir)
+        convert_request = store.request_converter(converter, collection_path)
+        if stream:
+            specs.append(converter.convert_stream(convert_request))
+        else:
+            specs.append(converter.convert(convert_request))
+        frames.append(store.record_collection(collection_path, digest, specs[-1]))
+    
+    if not patch:
+        spec, conflicts = merge_specs(specs, collection_paths)
+        return spec, conflicts, store
+    frame, _ = merge_specs([dict(frame, paths={}) for frame in frames], collection_paths)
+    del frame['paths']
+    spec = spec_yaml.load_spec(output_path)
+    patched = store.patch(spec, frame, collection_paths)
+    if patched is None:
+        print("Previous spec cannot be patched; converting every collection")
+        return convert_incremental(collection_paths, output_dir, filename, stream, dedup, patch=False)
+    print(f"Patched {patched} operations into {output_path}")
+    return spec, [], store
+
+
+def save_change_report(store: FingerprintStore, spec: Dict[str, Any], output_path: str,
+                       dedup: bool = False) -> Dict:
+    """Store fingerprints and the change report next to the output and print a summary."""
+    output_path = Path(output_path)
+    report = store.change_report(spec)
+    document = store.document(file_digest(output_path), dedup)
+    write_if_changed(output_path.with_suffix('.fingerprints.json'), json.dumps(document, indent=2))
+    write_if_changed(output_path.with_suffix('.changes.json'), json.dumps(report, indent=2))
+    
+    items, operations = report['items'], report['operations']
+    print(f"Items: {items['added']} added, {items['changed']} changed, {items['removed']} removed, "
+          f"{items['unchanged']} unchanged ({items['reused']} reused)")
+    print(f"Operations: {len(operations['added'])} added, {len(operations['changed'])} changed, "
+          f"{len(operations['removed'])} removed")
+    listed = [(kind, operation) for kind in ('added', 'changed', 'removed') for operation in operations[kind]]
+    for kind, operation in listed[:CHANGES_LISTED]:
+        print(f"  {kind}: {operation}")
+    if len(listed) > CHANGES_LISTED:
+        print(f"  ... and {len(listed) - CHANGES_LISTED} more in {output_path.with_suffix('.changes.json')}")
+    return report
+
+
+COLLECTION_PATH = str(Path(__file__).parent.parent / "megaport_collection.json")
+OUTPUT_DIR = str(Path(__file__).parent.parent / "specs")
+OUTPUT_FILENAME = "megaport-api-converted.yaml"
+
 def main():
-    # Paths
-    collection_path = "/home/test/APITestingTask/megaport_collection.json"
-    output_dir = "/home/test/APITestingTask/specs"
+    parser = argparse.ArgumentParser(description='Convert Postman collections to one OpenAPI 3.0 spec.')
+    parser.add_argument('collections', nargs='*', default=[COLLECTION_PATH],
+                        help='collections to convert and merge; earlier ones win conflicts')
+    parser.add_argument('--output-dir', default=OUTPUT_DIR, help='directory for the converted spec')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1,
+                        help='convert this many collections at once on a process pool')
+    parser.add_argument('--stream', action='store_true',
+                        help='read the collection incrementally; memory follows folder depth, not file size')
+    parser.add_argument('--dedup', action='store_true',
+                        help='move repeated responses, parameters and request bodies into components')
+    parser.add_argument('--incremental', action='store_true',
+                        help='reuse operations of request items unchanged since the last run and write a '
+                             'change report next to the output (collections are converted in this process)')
+    args = parser.parse_args()
     
     # Convert
-    converter = PostmanToOpenAPI(collection_path, output_dir)
-    openapi_spec = converter.convert()
+    converter = PostmanToOpenAPI(args.collections[0], args.output_dir)
+    if args.incremental:
+        openapi_spec, conflicts, store = convert_incremental(args.collections, args.output_dir, OUTPUT_FILENAME,
+                                                             args.stream, args.dedup)
+    else:
+        specs = convert_collections(args.collections, args.output_dir, args.jobs, args.stream)
+        openapi_spec, conflicts = merge_specs(specs, args.collections)
+    if len(args.collections) > 1:
+        print(f"Merged {len(args.collections)} collections into {len(openapi_spec['paths'])} paths")
+    if conflicts:
+        report_conflicts(conflicts)
+    
+    if args.dedup:
+        replaced = deduplicate_components(openapi_spec)
+        print("Deduplicated " + ", ".join(f"{count} {section}" for section, count in replaced.items()))
     
     # Save
-    converter.save_as_yaml(openapi_spec)
+    output_path = converter.save_as_yaml(openapi_spec, OUTPUT_FILENAME)
+    if args.incremental:
+        save_change_report(store, openapi_spec, output_path, args.dedup)
     
     print("\n✅ Conversion completed successfully!")
 
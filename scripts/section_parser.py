@@ -4,12 +4,39 @@ Section-based HTML parser for Megaport API documentation.
 Extracts complete endpoint information by parsing HTML sections.
 """
 
+import argparse
 import re
 import json
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
-def extract_endpoint_from_section(section_html, section_id):
-    """Extract complete endpoint information from an HTML section"""
+from content_cache import DEFAULT_CACHE_DIR, ContentCache, file_digest, write_if_changed
+from doc_scanner import ENGINES, PatternPair, decode, load_scan, read_document
+
+# Bump whenever a parser change alters the catalog, to invalidate cached parses
+PARSER_VERSION = 'sections-1'
+
+# Below this many sections a process pool costs more to start than it saves
+PARALLEL_MIN_SECTIONS = 200
+BATCHES_PER_JOB = 4
+
+METHOD_NAME_PATTERN = PatternPair(r'<span class="sc-fzoaKM [^"]+">(\w+)</span><span class="sc-fzomuh eaYntv documentation-core-item-request-name">([^<]+)</span>')
+URL_PATTERNS = [
+    PatternPair(r'https://api-staging\.megaport\.com(/v\d+/[^\s"\'<>&]+)'),
+    PatternPair(r'"url"\s*:\s*"https://api-staging\.megaport\.com(/v\d+/[^\s"\']+)"'),
+    PatternPair(r'href="https://api-staging\.megaport\.com(/v\d+/[^\s"\'<>&]+)"')
+]
+DESC_PATTERN = PatternPair(r'<div class="sc-fzoJIu [^"]+">([^<]+)</div>')
+
+def extract_endpoint_from_section(section_html, section_id, start=0, end=None):
+    """Extract complete endpoint information from an HTML section
+
+    section_html may be the whole document, in which case start/end give the
+    section body offsets and nothing is copied out of it. It may also be bytes
+    or an mmap, in which case only the captured groups are decoded.
+    """
+    if end is None:
+        end = len(section_html)
     endpoint = {
         'section_id': section_id,
         'method': None,
@@ -21,24 +48,17 @@ def extract_endpoint_from_section(section_html, section_id):
     }
     
     # Extract method and name from request header
-    method_name_pattern = r'<span class="sc-fzoaKM [^"]+">(\w+)</span><span class="sc-fzomuh eaYntv documentation-core-item-request-name">([^<]+)</span>'
-    method_name_match = re.search(method_name_pattern, section_html)
+    method_name_match = METHOD_NAME_PATTERN(section_html).search(section_html, start, end)
     if method_name_match:
-        endpoint['method'] = method_name_match.group(1)
-        endpoint['name'] = method_name_match.group(2).strip()
+        endpoint['method'] = decode(method_name_match.group(1))
+        endpoint['name'] = decode(method_name_match.group(2)).strip()
     
     # Extract URL from the same section
     # Look for URL patterns in the section
-    url_patterns = [
-        r'https://api-staging\.megaport\.com(/v\d+/[^\s"\'<>&]+)',
-        r'"url"\s*:\s*"https://api-staging\.megaport\.com(/v\d+/[^\s"\']+)"',
-        r'href="https://api-staging\.megaport\.com(/v\d+/[^\s"\'<>&]+)"'
-    ]
-    
-    for pattern in url_patterns:
-        url_match = re.search(pattern, section_html)
+    for pattern in URL_PATTERNS:
+        url_match = pattern(section_html).search(section_html, start, end)
         if url_match:
-            endpoint['url'] = url_match.group(1)
+            endpoint['url'] = decode(url_match.group(1))
             # Clean up HTML entities
             endpoint['url'] = endpoint['url'].replace('&amp;', '&')
             endpoint['url'] = endpoint['url'].replace('&#x27;', "'")
@@ -47,34 +67,76 @@ def extract_endpoint_from_section(section_html, section_id):
             break
     
     # Extract description
-    desc_pattern = r'<div class="sc-fzoJIu [^"]+">([^<]+)</div>'
-    desc_match = re.search(desc_pattern, section_html)
+    desc_match = DESC_PATTERN(section_html).search(section_html, start, end)
     if desc_match:
-        endpoint['description'] = desc_match.group(1).strip()
+        endpoint['description'] = decode(desc_match.group(1)).strip()
     
     return endpoint
 
-def parse_api_docs_by_sections(html_file_path):
-    """Parse HTML documentation by sections"""
+_worker_documents = {}
+
+def _extract_batch(html_file_path, engine, batch):
+    """Process pool worker: extract a batch of (section_id, start, end) sections."""
+    key = (str(html_file_path), engine)
+    if key not in _worker_documents:
+        _worker_documents[key] = read_document(html_file_path, engine)
+    content = _worker_documents[key]
+    return [extract_endpoint_from_section(content, section_id, start, end) for section_id, start, end in batch]
+
+def extract_sections_parallel(html_file_path, engine, work, jobs):
+    """Extract sections on a process pool, returning endpoints in the order of work.
+
+    Each worker reads (or maps) the document once and receives only the
+    section offsets, so no section text crosses process boundaries.
+    """
+    batch_count = jobs * BATCHES_PER_JOB
+    batch_size = max(1, -(-len(work) // batch_count))
+    batches = [work[i:i + batch_size] for i in range(0, len(work), batch_size)]
+    endpoints = []
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        for batch_endpoints in executor.map(_extract_batch, [html_file_path] * len(batches),
+                                            [engine] * len(batches), batches):
+            endpoints.extend(batch_endpoints)
+    return endpoints
+
+def parse_api_docs_by_sections(html_file_path, section_ids=None, engine='text', jobs=1):
+    """Parse HTML documentation by sections
+
+    When section_ids is given only those sections are extracted. engine is
+    'text' or 'mmap' (see doc_scanner.load_scan). With jobs > 1 sections are
+    extracted on a process pool, unless there are too few to be worth it.
+    """
     print(f"Parsing {html_file_path} by sections...")
     
-    with open(html_file_path, 'r', encoding='utf-8') as f:
-        html_content = f.read()
+    scan = load_scan(html_file_path, engine)
+    content = scan.content
+    sections = scan.sections
     
-    print(f"File size: {len(html_content)} bytes")
+    print(f"File size: {len(content)} bytes")
+    print(f"Found {len(sections)} sections")
     
-    # Find all sections with IDs
-    section_pattern = r'<section id="([^"]+)"[^>]*>(.*?)</section>'
-    sections = re.findall(section_pattern, html_content, re.DOTALL)
+    # A request header belongs to the innermost section around it, so outer
+    # folder and wrapper sections do not repeat their children's endpoints.
+    # Extraction starts at the section's own header to skip nested children
+    # that come before it.
+    header_offsets = {}
+    for offset, _, _ in scan.request_headers:
+        header_offsets.setdefault(sections.innermost(offset), offset)
     
-    print(f"Found {len(sections)} sections")
+    if section_ids is None:
+        candidates = range(len(sections))
+    else:
+        candidates = sections.indices_for(section_ids)
     
-    endpoints = []
+    work = [(sections.ids[i], header_offsets[i], sections.ends[i]) for i in candidates if i in header_offsets]
     
-    for section_id, section_content in sections:
-        endpoint = extract_endpoint_from_section(section_content, section_id)
-        if endpoint['method'] and endpoint['name']:
-            endpoints.append(endpoint)
+    if jobs > 1 and len(work) >= PARALLEL_MIN_SECTIONS:
+        print(f"Extracting {len(work)} sections with {jobs} jobs")
+        extracted = extract_sections_parallel(html_file_path, engine, work, jobs)
+    else:
+        extracted = [extract_endpoint_from_section(content, section_id, start, end) for section_id, start, end in work]
+    
+    endpoints = [endpoint for endpoint in extracted if endpoint['method'] and endpoint['name']]
     
     # Group endpoints by API version
     version_groups = {'v1': [], 'v2': [], 'v3': [], 'v4': []}
@@ -110,15 +172,44 @@ def parse_api_docs_by_sections(html_file_path):
         'stats': stats
     }
 
+def load_catalog(html_file_path, cache_dir=DEFAULT_CACHE_DIR, use_cache=True, engine='text', jobs=1):
+    """Return (catalog, catalog_json, cached) for the documentation file.
+
+    The serialized catalog is cached under the file's content hash and
+    PARSER_VERSION, so unchanged docs are not parsed again.
+    """
+    cache = ContentCache(cache_dir, 'endpoints_by_section') if use_cache else None
+    if cache:
+        digest = file_digest(html_file_path)
+        catalog_json = cache.load(digest, PARSER_VERSION)
+        if catalog_json is not None:
+            return json.loads(catalog_json), catalog_json, True
+    
+    catalog = parse_api_docs_by_sections(html_file_path, engine=engine, jobs=jobs)
+    catalog_json = json.dumps(catalog, indent=2)
+    if cache:
+        cache.store(digest, PARSER_VERSION, catalog_json)
+    return catalog, catalog_json, False
+
 def main():
+    parser = argparse.ArgumentParser(description='Parse the API documentation HTML by sections.')
+    parser.add_argument('--engine', choices=ENGINES, default='text',
+                        help='text decodes the whole file; mmap runs bytes patterns over a memory map')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='extract sections on this many processes (serial for small inputs)')
+    parser.add_argument('--no-cache', action='store_true', help='always reparse and do not update the parse cache')
+    parser.add_argument('--cache-dir', type=Path, default=DEFAULT_CACHE_DIR, help='directory for cached parses')
+    args = parser.parse_args()
+    
     html_file = Path(__file__).parent.parent / 'docs' / 'api_docs.html'
     output_file = Path(__file__).parent.parent / 'docs' / 'endpoints_by_section.json'
     
-    result = parse_api_docs_by_sections(html_file)
+    result, result_json, cached = load_catalog(html_file, args.cache_dir, not args.no_cache, args.engine, args.jobs)
+    if cached:
+        print(f"Using cached parse of {html_file}")
     
-    # Save results
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(result, f, indent=2)
+    # Save results, leaving the file untouched when nothing changed
+    written = write_if_changed(output_file, result_json)
     
     print(f"\n{'='*60}")
     print("PARSING RESULTS")
@@ -135,7 +226,10 @@ def main():
     if result['stats']['unversioned']:
         print(f"  Unversioned: {result['stats']['unversioned']}")
     
-    print(f"\nResults saved to: {output_file}")
+    if written:
+        print(f"\nResults saved to: {output_file}")
+    else:
+        print(f"\nResults unchanged: {output_file}")
     
     # Show sample endpoints
     print(f"\n{'='*60}")
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Structural deduplication of OpenAPI operation fragments.
+Responses, parameters and request bodies that repeat across operations are
+moved into components once and the operations point at them with $ref.
+"""
+
+import hashlib
+import json
+import re
+
+HTTP_METHODS = ('get', 'put', 'post', 'delete', 'options', 'head', 'patch', 'trace')
+SECTIONS = ('responses', 'parameters', 'requestBodies')
+
+
+def fragment_digest(fragment):
+    """Hash a JSON-compatible subtree independently of its key order."""
+    canonical = json.dumps(fragment, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def pascal_case(text):
+    """Turn 'Successful response' or 'employeeId' into 'SuccessfulResponse' or 'EmployeeId'."""
+    words = re.findall(r'[A-Za-z0-9]+', str(text))
+    return ''.join(word[0].upper() + word[1:] for word in words)
+
+
+def base_name(section, fragment):
+    """Component name suggested by a fragment's own content."""
+    if section == 'responses':
+        return pascal_case(fragment.get('description', '')) or 'Response'
+    if section == 'parameters':
+        return pascal_case(fragment.get('name', '')) or 'Parameter'
+    media_types = list(fragment.get('content', {}))
+    subtype = media_types[0].split('/')[-1] if media_types else ''
+    return pascal_case(subtype) + 'Body'
+
+
+def iter_slots(spec):
+    """Yield (section, container, key) for every responses, parameters and requestBody slot in the paths."""
+    for path_item in spec.get('paths', {}).values():
+        if not isinstance(path_item, dict):
+            continue
+        for index in range(len(path_item.get('parameters', []))):
+            yield 'parameters', path_item['parameters'], index
+        for method in HTTP_METHODS:
+            operation = path_item.get(method)
+            if not isinstance(operation, dict):
+                continue
+            for status in operation.get('responses', {}):
+                yield 'responses', operation['responses'], status
+            for index in range(len(operation.get('parameters', []))):
+                yield 'parameters', operation['parameters'], index
+            if 'requestBody' in operation:
+                yield 'requestBodies', operation, 'requestBody'
+
+
+def deduplicate_components(spec, min_count=2):
+    """Move repeated operation fragments into spec['components'] and replace them with $ref.
+
+    A fragment equal to an existing component is pointed at that component.
+    Otherwise fragments seen at least min_count times become new components,
+    named after their description, parameter name or media type and taken
+    from their first occurrence. Returns the number of fragments replaced
+    per section.
+    """
+    slots = [(section, container, key) for section, container, key in iter_slots(spec)
+             if isinstance(container[key], dict) and '$ref' not in container[key]]
+    digests = [fragment_digest(container[key]) for _, container, key in slots]
+    counts = {}
+    for (section, _, _), digest in zip(slots, digests):
+        counts[section, digest] = counts.get((section, digest), 0) + 1
+
+    components = spec.setdefault('components', {})
+    names = {}
+    for section in SECTIONS:
+        for name, value in components.get(section, {}).items():
+            names.setdefault((section, fragment_digest(value)), name)
+
+    replaced = {section: 0 for section in SECTIONS}
+    for (section, container, key), digest in zip(slots, digests):
+        name = names.get((section, digest))
+        if name is None:
+            if counts[section, digest] < min_count:
+                continue
+            entries = components.setdefault(section, {})
+            name = base = base_name(section, container[key])
+            suffix = 1
+            while name in entries:
+                suffix += 1
+                name = f"{base}{suffix}"
+            entries[name] = container[key]
+            names[section, digest] = name
+        container[key] = {'$ref': f"#/components/{section}/{name}"}
+        replaced[section] += 1
+    return replaced
+
+
+def rebase_local_refs(node, target):
+    """Point '#/...' references in a subtree at the document target, e.g. '../../openapi.yaml'."""
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key == '$ref' and isinstance(value, str) and value.startswith('#/'):
+                node[key] = target + value
+            else:
+                rebase_local_refs(value, target)
+    elif isinstance(node, list):
+        for value in node:
+            rebase_local_refs(value, target)
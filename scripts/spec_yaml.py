@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Shared YAML loading and dumping for the spec scripts.
+Uses the LibYAML loader and emitter when PyYAML was built with them and
+falls back to the pure-Python implementation otherwise. Output is meant to
+be byte-for-byte what yaml.dump writes; --verify (or SPEC_YAML_VERIFY=1)
+checks every load and dump against the pure-Python result. load_spec keeps
+a marshalled snapshot of each parsed file in the content cache, so a file
+that has not changed since it was last loaded is not parsed again.
+"""
+
+import argparse
+import hashlib
+import io
+import marshal
+import os
+import re
+import sys
+
+import yaml
+from yaml.emitter import Emitter
+
+from content_cache import DEFAULT_CACHE_DIR, ContentCache
+
+try:
+    from yaml import CDumper as FastDumper, CSafeLoader as FastSafeLoader
+    BACKEND = 'libyaml'
+except ImportError:
+    FastDumper, FastSafeLoader = yaml.Dumper, yaml.SafeLoader
+    BACKEND = 'python'
+
+VERIFY = os.environ.get('SPEC_YAML_VERIFY', '') not in ('', '0')
+
+# Bump when snapshots written by an older version must not be reused.
+# Snapshots are marshalled rather than pickled, so loading one never calls
+# code named in the data. marshal is still not meant for untrusted input:
+# crafted bytes can decode to code objects or crash the interpreter, so the
+# cache directory must not be writable by anyone you would not let edit the
+# scripts. A snapshot that does not decode to a dict or list is reparsed.
+SNAPSHOT_VERSION = f'marshal{marshal.version}-1'
+
+# Characters the emitters quote or break differently: controls other than
+# newline, C1 controls, Unicode line and paragraph separators, the BOM and
+# surrogates, plus all non-ASCII text when allow_unicode is off
+SPECIAL_CHARACTERS = re.compile('[\x00-\x09\x0b-\x1f\x7f-\x9f\u2028\u2029\ufeff\ud800-\udfff\U00010000-\U0010ffff]')
+NON_ASCII_CHARACTERS = re.compile('[^\n\x20-\x7e]')
+
+# The keyword arguments the spec scripts dump with, checked by --verify
+DUMP_STYLES = (
+    {'default_flow_style': False, 'sort_keys': False, 'allow_unicode': True},
+    {'default_flow_style': False, 'sort_keys': False},
+    {'sort_keys': False},
+)
+
+# Raised for malformed YAML, so callers need not import yaml themselves
+YAMLError = yaml.YAMLError
+
+
+class YamlVerifyError(ValueError):
+    """The LibYAML result differs from the pure-Python one."""
+
+
+def set_verify(enabled=True):
+    """Check every following load and dump against the pure-Python implementation."""
+    global VERIFY
+    VERIFY = enabled
+
+
+def _first_difference(expected, actual):
+    expected_lines, actual_lines = expected.splitlines(), actual.splitlines()
+    for number, (left, right) in enumerate(zip(expected_lines, actual_lines), 1):
+        if left != right:
+            return f"line {number}: expected {left!r}, got {right!r}"
+    return f"expected {len(expected_lines)} lines, got {len(actual_lines)}"
+
+
+def safe_load(stream):
+    """yaml.safe_load on a str, bytes or file object, through LibYAML when available."""
+    if not VERIFY or BACKEND == 'python':
+        return yaml.load(stream, Loader=FastSafeLoader)
+    text = stream if isinstance(stream, (str, bytes)) else stream.read()
+    data = yaml.load(text, Loader=FastSafeLoader)
+    if data != yaml.safe_load(text):
+        raise YamlVerifyError("LibYAML and pure-Python loads differ")
+    return data
+
+
+def load_file(path):
+    """Load a YAML file with safe_load."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return safe_load(f)
+
+
+def load_spec(path, cache_dir=DEFAULT_CACHE_DIR, use_snapshot=True):
+    """Load a YAML file through a pre-parsed snapshot keyed on its content hash.
+
+    On a miss the file is parsed with safe_load and the result marshalled
+    into cache_dir/spec-snapshots; documents holding values marshal cannot
+    store, such as YAML timestamps, are simply not snapshotted, and only
+    mappings and sequences are. Every call returns a fresh copy, so callers
+    may modify it. Snapshots are bypassed while VERIFY is on.
+    """
+    with open(path, 'rb') as f:
+        raw = f.read()
+    if not use_snapshot or VERIFY:
+        return safe_load(raw)
+    cache = ContentCache(cache_dir, 'spec-snapshots')
+    digest = hashlib.sha256(raw).hexdigest()
+    snapshot = cache.load_bytes(digest, SNAPSHOT_VERSION)
+    if snapshot is not None:
+        try:
+            data = marshal.loads(snapshot)
+        except (EOFError, ValueError, TypeError):
+            data = None
+        if isinstance(data, (dict, list)):
+            return data
+    data = safe_load(raw)
+    if isinstance(data, (dict, list)):
+        try:
+            cache.store(digest, SNAPSHOT_VERSION, marshal.dumps(data))
+        except (OSError, ValueError):
+            # A read-only checkout, or a value marshal cannot store, still loads without a snapshot
+            pass
+    return data
+
+
+class _FoldingCheck:
+    """Finds values whose strings LibYAML would write differently from PyYAML.
+
+    The two emitters disagree on how long double-quoted scalars are broken
+    across lines, and on which quoting some control characters and Unicode
+    line breaks need. Strings that need double quotes or contain such
+    characters go to the pure-Python emitter.
+    """
+
+    def __init__(self, allow_unicode):
+        self.emitter = Emitter(io.StringIO(), allow_unicode=allow_unicode)
+        self.special = SPECIAL_CHARACTERS if allow_unicode else NON_ASCII_CHARACTERS
+        self.seen = {}
+
+    def risky(self, node):
+        if isinstance(node, str):
+            if node.isascii() and node.isprintable():
+                return False
+            risky = self.seen.get(node)
+            if risky is None:
+                risky = self.seen[node] = bool(self.special.search(node)) or \
+                    not self.emitter.analyze_scalar(node).allow_single_quoted
+            return risky
+        if isinstance(node, dict):
+            return any(self.risky_key(key) or self.risky(value) for key, value in node.items())
+        if isinstance(node, (list, tuple)):
+            return any(self.risky(value) for value in node)
+        return False
+
+    def risky_key(self, key):
+        """Keys also differ when PyYAML would write them as '? ' complex keys."""
+        if isinstance(key, str) and (not key or len(key) >= 128):
+            return True
+        return self.risky(key)
+
+
+def _shares_containers(node, seen=None):
+    """True when a dict or list appears twice, which yaml.dump writes as an anchor and alias."""
+    if seen is None:
+        seen = set()
+    if isinstance(node, (dict, list)):
+        if id(node) in seen:
+            return True
+        seen.add(id(node))
+        values = node.values() if isinstance(node, dict) else node
+        return any(_shares_containers(value, seen) for value in values)
+    return False
+
+
+def _hybrid_dump(data, kwargs):
+    """Dump data like yaml.dump, emitting with LibYAML wherever that gives the same bytes.
+
+    A block-style top-level mapping is written key by key, so only the keys
+    holding strings LibYAML would fold differently go through pure Python.
+    """
+    check = _FoldingCheck(kwargs.get('allow_unicode', False))
+    splittable = (isinstance(data, dict) and data and not kwargs.get('default_flow_style')
+                  and set(kwargs) <= {'default_flow_style', 'sort_keys', 'allow_unicode', 'width', 'indent'}
+                  and not _shares_containers(data))
+    if not splittable:
+        return yaml.dump(data, Dumper=yaml.Dumper if check.risky(data) else FastDumper, **kwargs)
+
+    keys = sorted(data) if kwargs.get('sort_keys', True) else list(data)
+    chunks = []
+    group, group_risky = {}, None
+    for key in keys:
+        risky = check.risky_key(key) or check.risky(data[key])
+        if group and risky != group_risky:
+            chunks.append(yaml.dump(group, Dumper=yaml.Dumper if group_risky else FastDumper, **kwargs))
+            group = {}
+        group[key] = data[key]
+        group_risky = risky
+    chunks.append(yaml.dump(group, Dumper=yaml.Dumper if group_risky else FastDumper, **kwargs))
+    return ''.join(chunks)
+
+
+def dump(data, stream=None, **kwargs):
+    """yaml.dump with the default Dumper's output, produced through LibYAML where possible.
+
+    Returns the text when stream is None, like yaml.dump.
+    """
+    text = yaml.dump(data, **kwargs) if BACKEND == 'python' else _hybrid_dump(data, kwargs)
+    if VERIFY and BACKEND != 'python':
+        expected = yaml.dump(data, **kwargs)
+        if text != expected:
+            raise YamlVerifyError(f"LibYAML and pure-Python dumps differ at {_first_difference(expected, text)}")
+    if stream is None:
+        return text
+    stream.write(text)
+
+
+def dump_file(path, data, **kwargs):
+    """Dump data to a YAML file."""
+    with open(path, 'w', encoding='utf-8') as f:
+        dump(data, f, **kwargs)
+
+
+def verify_file(path):
+    """Return a list of problems found loading and re-dumping path with both backends."""
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    try:
+        expected = yaml.safe_load(text)
+    except yaml.YAMLError as exc:
+        return [f"not loadable: {exc.__class__.__name__}"]
+    problems = []
+    if yaml.load(text, Loader=FastSafeLoader) != expected:
+        problems.append("loads differ")
+    for style in DUMP_STYLES:
+        wanted = yaml.dump(expected, **style)
+        written = _hybrid_dump(expected, style)
+        if written != wanted:
+            problems.append(f"dump {style} differs at {_first_difference(wanted, written)}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check the LibYAML backend against pure-Python PyYAML.')
+    parser.add_argument('--verify', action='store_true', help='compare loads and dumps of each file byte for byte')
+    parser.add_argument('files', nargs='*', help='YAML files to check')
+    args = parser.parse_args()
+
+    print(f"YAML backend: {BACKEND}")
+    if not args.verify:
+        return
+    failures = 0
+    for path in args.files:
+        problems = verify_file(path)
+        for problem in problems:
+            print(f"{path}: {problem}")
+        failures += bool(problems)
+    print(f"Verified {len(args.files)} files, {failures} with differences")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,13 @@
-import yaml
+import argparse
+import glob
 import os
-import shutil
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import spec_yaml
+from content_cache import write_if_changed
+from spec_components import SECTIONS, rebase_local_refs
 
 def clean_tag_name(name):
     """Clean tag name for directory usage."""
@@ -11,12 +17,36 @@ def clean_tag_name(name):
     clean = re.sub(r'-+', '-', clean).strip('-')
     return clean if clean else "default"
 
-def split_openapi():
-    source_file = "/home/test/APITestingTask/specs/megaport-api-converted.yaml"
-    output_base = "/home/test/APITestingTask/specs"
-    
-    with open(source_file, 'r') as f:
-        data = yaml.safe_load(f)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE_FILE = os.path.join(BASE_DIR, "specs", "megaport-api-converted.yaml")
+OUTPUT_BASE = os.path.join(BASE_DIR, "specs")
+DEFAULT_JOBS = min(8, (os.cpu_count() or 1) + 4)
+
+def write_path_file(job):
+    """Render one path file and write it only if its content changed. Returns True if written."""
+    full_file_path, path, methods = job
+    # Local refs have to point back at the root file from the path file
+    rebase_local_refs(methods, "../../openapi.yaml")
+    return write_if_changed(full_file_path, spec_yaml.dump({path: methods}, sort_keys=False))
+
+def find_stale_files(paths_dir, expected):
+    """Return the YAML files in the tag folders of paths_dir that no path of the spec maps to.
+
+    Only paths_dir/<tag>/*.yaml is written here; files directly in paths_dir
+    or deeper down belong to other scripts.
+    """
+    return sorted(file_path for file_path in glob.glob(os.path.join(glob.escape(paths_dir), "*", "*.yaml"))
+                  if os.path.isfile(file_path) and os.path.normpath(file_path) not in expected)
+
+def split_openapi(source_file=SOURCE_FILE, output_base=OUTPUT_BASE, jobs=DEFAULT_JOBS):
+    """Split source_file into openapi.yaml and paths/<tag>/<path>.yaml under output_base.
+
+    Files are rendered in memory on a thread pool and only written, through an
+    atomic rename, when their content differs from what is on disk. Returns
+    the written, unchanged and stale file paths.
+    """
+    started = time.perf_counter()
+    data = spec_yaml.load_spec(source_file)
     
     # 1. Save main openapi.yaml
     openapi_main = {
@@ -32,14 +62,21 @@ def split_openapi():
         }
     }
     
+    # Shared fragments from postman_to_openapi --dedup stay in the root file
+    for section in SECTIONS:
+        if section in data.get("components", {}):
+            openapi_main["components"][section] = data["components"][section]
+    
     # Map tags to their description
     tags_info = {t['name']: t for t in data.get('tags', [])}
-    used_tags = set()
+    # Tags in order of first use, so the root file is the same from run to run
+    used_tags = {}
     
     paths = data.get('paths', {})
     
     print(f"Processing {len(paths)} paths...")
     
+    file_jobs = []
     for path, methods in paths.items():
         # Determine primary tag for this path
         # Heuristic: use the first tag of the first method
@@ -53,11 +90,9 @@ def split_openapi():
         
         # Clean tag for folder name
         folder_name = clean_tag_name(path_tag)
-        used_tags.add(path_tag)
+        used_tags.setdefault(path_tag, None)
         
-        # Create folder
         folder_path = os.path.join(output_base, "paths", folder_name)
-        os.makedirs(folder_path, exist_ok=True)
         
         # Create filename from path
         # e.g. /v2/locations -> v2-locations.yaml
@@ -65,16 +100,20 @@ def split_openapi():
         file_name = re.sub(r'-+', '-', file_name) + ".yaml"
         
         full_file_path = os.path.join(folder_path, file_name)
-        
-        # Save individual path file
-        with open(full_file_path, 'w') as f:
-            yaml.dump({path: methods}, f, sort_keys=False)
+        file_jobs.append((full_file_path, path, methods))
             
         # Add ref to main openapi
         # Reference path relative to specs/openapi.yaml
         ref_path = f"./paths/{folder_name}/{file_name}"
         openapi_main["paths"][path] = {"$ref": ref_path}
 
+    # Save individual path files; rendering and comparing dominate, not the disk
+    if jobs > 1 and len(file_jobs) > 1:
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            written = list(executor.map(write_path_file, file_jobs))
+    else:
+        written = [write_path_file(job) for job in file_jobs]
+
     # valid tags
     for tag in used_tags:
         if tag in tags_info:
@@ -83,10 +122,34 @@ def split_openapi():
             openapi_main["tags"].append({"name": tag})
             
     # Save root openapi.yaml
-    with open(os.path.join(output_base, "openapi.yaml"), 'w') as f:
-        yaml.dump(openapi_main, f, sort_keys=False)
+    root_file = os.path.join(output_base, "openapi.yaml")
+    root_written = write_if_changed(root_file, spec_yaml.dump(openapi_main, sort_keys=False))
+
+    file_paths = [job[0] for job in file_jobs]
+    expected = {os.path.normpath(file_path) for file_path in file_paths}
+    stale = find_stale_files(os.path.join(output_base, "paths"), expected)
+    result = {
+        "written": [file_path for file_path, changed in zip(file_paths, written) if changed],
+        "unchanged": [file_path for file_path, changed in zip(file_paths, written) if not changed],
+        "stale": stale
+    }
+    (result["written"] if root_written else result["unchanged"]).append(root_file)
+
+    print(f"Split complete in {time.perf_counter() - started:.2f}s: "
+          f"{len(result['written'])} written, {len(result['unchanged'])} unchanged")
+    if stale:
+        print(f"{len(stale)} stale files under {os.path.join(output_base, 'paths')} no longer match any path:")
+        for file_path in stale:
+            print(f"  {os.path.relpath(file_path, output_base)}")
+    return result
 
-    print("Split complete.")
+def main():
+    parser = argparse.ArgumentParser(description='Split a converted OpenAPI spec into per-path files.')
+    parser.add_argument('source', nargs='?', default=SOURCE_FILE, help='converted OpenAPI YAML file')
+    parser.add_argument('--output-base', default=OUTPUT_BASE, help='directory receiving openapi.yaml and paths/')
+    parser.add_argument('--jobs', type=int, default=DEFAULT_JOBS, help='threads rendering and writing path files')
+    args = parser.parse_args()
+    split_openapi(args.source, args.output_base, args.jobs)
 
 if __name__ == "__main__":
-    split_openapi()
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Table-driven tag classification of endpoint names.
+The keywords of every rule in tag_rules.yaml are compiled into word lookup
+tables, so a name is classified in a single pass over its words, and the
+rule and keyword that decided the tag are reported with it.
+"""
+
+import argparse
+import re
+from pathlib import Path
+
+import spec_yaml
+
+RULES_FILE = Path(__file__).parent / 'tag_rules.yaml'
+
+
+class TagRulesError(ValueError):
+    """The rules file is malformed."""
+
+
+# Names and keywords are compared word by word; hyphens and punctuation separate words
+WORD_PATTERN = re.compile(r'[^\W_]+')
+
+
+class TagClassifier:
+    """Classifies names by the first of an ordered list of (tag, keywords) rules that matches.
+
+    Keywords are compiled into lookup tables keyed by word: whole words,
+    word prefixes (keywords ending in '*') and phrases keyed by their first
+    word. A name is split into words once and each word is looked up, so
+    the cost follows the length of the name rather than the number of rules.
+    The match with the earliest rule wins, wherever it is in the name.
+    """
+
+    def __init__(self, rules, default='General'):
+        self.rules = [(rule['tag'], list(rule['keywords'])) for rule in rules]
+        self.default = default
+        # word or prefix -> (rule index, keyword); the earliest rule keeps a word
+        self.words = {}
+        self.prefixes = {}
+        # first word -> [(following words, last word is a prefix, rule index, keyword)]
+        self.phrases = {}
+        for index, (tag, keywords) in enumerate(self.rules):
+            if not keywords:
+                raise TagRulesError(f"Rule {tag!r} has no keywords")
+            for keyword in keywords:
+                words = WORD_PATTERN.findall(str(keyword).lower())
+                if not words:
+                    raise TagRulesError(f"Rule {tag!r} has an empty keyword {keyword!r}")
+                prefix = str(keyword).endswith('*')
+                if len(words) > 1:
+                    self.phrases.setdefault(words[0], []).append((tuple(words[1:]), prefix, index, keyword))
+                else:
+                    (self.prefixes if prefix else self.words).setdefault(words[0], (index, keyword))
+        self.prefix_lengths = sorted({len(word) for word in self.prefixes})
+        # Word -> its best whole-word or prefix hit; names share most of their words
+        self.word_hits = {}
+
+    @classmethod
+    def from_file(cls, path=RULES_FILE):
+        document = spec_yaml.load_spec(path)
+        if not isinstance(document, dict) or not isinstance(document.get('rules'), list):
+            raise TagRulesError(f"{path} needs a 'rules' list")
+        for rule in document['rules']:
+            if not isinstance(rule, dict) or 'tag' not in rule or not isinstance(rule.get('keywords'), list):
+                raise TagRulesError(f"{path}: every rule needs a tag and a keywords list, got {rule!r}")
+        return cls(document['rules'], document.get('default', 'General'))
+
+    def _phrase_matches(self, words, position, rest, prefix):
+        following = words[position + 1:position + 1 + len(rest)]
+        if len(following) != len(rest):
+            return False
+        if prefix:
+            return following[:-1] == list(rest[:-1]) and following[-1].startswith(rest[-1])
+        return following == list(rest)
+
+    def word_hit(self, word):
+        """The earliest (rule index, keyword) a single word matches as a whole word or prefix, or None."""
+        if word not in self.word_hits:
+            best = self.words.get(word)
+            for length in self.prefix_lengths:
+                if length > len(word):
+                    break
+                hit = self.prefixes.get(word[:length])
+                if hit is not None and (best is None or hit[0] < best[0]):
+                    best = hit
+            self.word_hits[word] = best
+        return self.word_hits[word]
+
+    def classify(self, name):
+        """Return (tag, rule index, keyword); index and keyword are None for the default tag."""
+        best = None
+        words = WORD_PATTERN.findall(name.lower())
+        for position, word in enumerate(words):
+            hit = self.word_hit(word)
+            if hit is not None and (best is None or hit[0] < best[0]):
+                best = hit
+            if word in self.phrases:
+                for rest, prefix, index, keyword in self.phrases[word]:
+                    if (best is None or index < best[0]) and self._phrase_matches(words, position, rest, prefix):
+                        best = index, keyword
+        if best is None:
+            return self.default, None, None
+        return self.rules[best[0]][0], best[0], best[1]
+
+    def explain(self, name):
+        """Describe the rule that fired for name, e.g. 'IX (rule 6, ix)'."""
+        tag, index, keyword = self.classify(name)
+        if index is None:
+            return f"{tag} (default)"
+        return f"{tag} (rule {index + 1}, {keyword})"
+
+
+_default_classifier = None
+
+
+def default_classifier():
+    """The classifier get_tag_from_name uses: RULES_FILE unless use_rules_file was called."""
+    global _default_classifier
+    if _default_classifier is None:
+        _default_classifier = TagClassifier.from_file(RULES_FILE)
+    return _default_classifier
+
+
+def use_rules_file(path):
+    """Classify with the rules in path from now on."""
+    global _default_classifier
+    _default_classifier = TagClassifier.from_file(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Show which tag rule classifies each endpoint name.')
+    parser.add_argument('names', nargs='*', help='endpoint names; read from --names-file otherwise')
+    parser.add_argument('--rules', type=Path, default=RULES_FILE, help='tag rules file')
+    parser.add_argument('--names-file', type=Path, help='file with one endpoint name per line')
+    args = parser.parse_args()
+
+    classifier = TagClassifier.from_file(args.rules)
+    names = list(args.names)
+    if args.names_file:
+        names += [line.strip() for line in args.names_file.read_text(encoding='utf-8').splitlines() if line.strip()]
+    for name in names:
+        print(f"{name}: {classifier.explain(name)}")
+
+
+if __name__ == '__main__':
+    main()